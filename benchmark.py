@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark harness for gitcheck
+
+Builds a synthetic farm of repositories offline (local bare repositories as
+remotes, dirty files, branches ahead of and behind their remotes), then
+times the main stages of gitcheck on it and prints the results as JSON:
+wall times and number of processes started for each stage, so releases can
+be compared. The import time of gitcheck (startup latency of short runs,
+like shell prompts) is measured in fresh interpreters.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+# Modules gitcheck only needs for some features, they must not slow down startup
+LAZY_MODULES = ('asyncio', 'smtplib', 'email.mime.multipart', 'rich.progress', 'rich.prompt',
+                'rich.live', 'concurrent.futures.process', 'gitcheck.https_utils', 'mygitcheck')
+
+FARM_ENV = {
+    'GIT_AUTHOR_NAME': 'gitcheck benchmark',
+    'GIT_AUTHOR_EMAIL': 'benchmark@example.com',
+    'GIT_COMMITTER_NAME': 'gitcheck benchmark',
+    'GIT_COMMITTER_EMAIL': 'benchmark@example.com',
+    'GIT_CONFIG_NOSYSTEM': '1',
+}
+
+
+class ProcessCounter:
+    """Count the processes started through subprocess.Popen (asyncio included)"""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+        self.original = subprocess.Popen.__init__
+
+    def __enter__(self):
+        counter = self
+        original = self.original
+
+        def __init__(popen, *args, **kwargs):
+            with counter.lock:
+                counter.count += 1
+            original(popen, *args, **kwargs)
+
+        subprocess.Popen.__init__ = __init__
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen.__init__ = self.original
+        return False
+
+
+def git(*args, cwd=None):
+    env = dict(os.environ, **FARM_ENV)
+    subprocess.run(['git'] + list(args), cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def buildFarm(root, repos, remotes, dirty, ahead, behind, group=50):
+    """
+    Create a synthetic repository farm
+
+    Repository i is dirty when i % 3 == 0, ahead of its remotes when
+    i % 3 == 1 and behind them when i % 3 == 2. Repositories are spread in
+    subdirectories of `group` repositories to exercise discovery.
+
+    Args:
+        root: Empty directory to build in
+        repos: Number of working repositories
+        remotes: Number of remotes per repository (local bare repositories)
+        dirty: Number of untracked and modified files of dirty repositories
+        ahead: Number of local commits of repositories ahead
+        behind: Number of commits repositories behind miss
+
+    Returns:
+        str: Directory holding the working repositories
+    """
+    seed = os.path.join(root, 'seed')
+    os.makedirs(seed)
+    git('init', '-q', '-b', 'main', cwd=seed)
+    for i in range(max(behind, 1) + 1):
+        with open(os.path.join(seed, 'file%d.txt' % i), 'w') as f:
+            f.write('content %d\n' % i)
+        git('add', '-A', cwd=seed)
+        git('commit', '-q', '-m', 'seed commit %d' % i, cwd=seed)
+
+    work = os.path.join(root, 'work')
+    for i in range(repos):
+        name = 'repo%04d' % i
+        repo = os.path.join(work, 'group%03d' % (i // group), name)
+        for j in range(remotes):
+            bare = os.path.join(root, 'remotes', 'remote%d' % j, name + '.git')
+            git('clone', '-q', '--bare', seed, bare)
+            if j == 0:
+                git('clone', '-q', '-o', 'origin', bare, repo)
+            else:
+                git('remote', 'add', 'remote%d' % j, bare, cwd=repo)
+                git('fetch', '-q', 'remote%d' % j, cwd=repo)
+
+        if i % 3 == 0:
+            for k in range(dirty):
+                with open(os.path.join(repo, 'untracked%d.txt' % k), 'w') as f:
+                    f.write('dirty\n')
+            with open(os.path.join(repo, 'file0.txt'), 'a') as f:
+                f.write('modified\n')
+        elif i % 3 == 1:
+            for k in range(ahead):
+                git('commit', '-q', '--allow-empty', '-m', 'local commit %d' % k, cwd=repo)
+        elif behind:
+            git('reset', '-q', '--hard', 'HEAD~%d' % behind, cwd=repo)
+    return work
+
+
+def measure(name, func, repeat, results):
+    """Run func repeat times, record wall times and process counts"""
+    walls = []
+    processes = []
+    for _ in range(repeat):
+        with ProcessCounter() as counter:
+            start = time.perf_counter()
+            func()
+            walls.append(time.perf_counter() - start)
+        processes.append(counter.count)
+    results[name] = {
+        'wall': [round(w, 4) for w in walls],
+        'wall_min': round(min(walls), 4),
+        'wall_median': round(statistics.median(walls), 4),
+        'processes': max(processes),
+    }
+    print("%-28s median %8.3fs  %6d processes" % (name, statistics.median(walls), max(processes)), file=sys.stderr)
+
+
+def measureImport(repeat, results):
+    """Time `import gitcheck.gitcheck` in fresh interpreters (python -X importtime)"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = "import sys, gitcheck.gitcheck; print(' '.join(m for m in %r if m in sys.modules))" % (LAZY_MODULES,)
+    imports = []
+    walls = []
+    loaded = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=root,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        walls.append(time.perf_counter() - start)
+        loaded = proc.stdout.decode().strip()
+        for line in proc.stderr.decode().splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'gitcheck.gitcheck':
+                imports.append(int(fields[1]) / 1e6)
+    results['import_gitcheck'] = {
+        'import': [round(t, 4) for t in imports],
+        'import_median': round(statistics.median(imports), 4),
+        'wall_median': round(statistics.median(walls), 4),
+        'lazy_modules_loaded': loaded.split(),
+    }
+    print("%-28s median %8.3fs  (interpreter %.3fs)" % ('import_gitcheck', statistics.median(imports), statistics.median(walls)),
+          file=sys.stderr)
+    if loaded:
+        print("  modules imported eagerly: %s" % loaded, file=sys.stderr)
+
+
+def runBenchmarks(work, repeat, jobs):
+    """Time the gitcheck stages on the farm, return the results dict"""
+    from rich.console import Console
+    from gitcheck import gitcheck
+
+    # Keep the reports out of the terminal
+    gitcheck.console = Console(file=io.StringIO(), width=120)
+
+    def configure(**options):
+        gitcheck.argopts.clear()
+        gitcheck.argopts.update({'searchDir': [work], 'jobs': jobs})
+        gitcheck.argopts.update(options)
+        gitcheck.gitContext = gitcheck.buildGitContext()
+        gitcheck.resetSnapshots()
+
+    results = {}
+    configure()
+    repos = sorted(gitcheck.searchRepositories())
+
+    def searchCold():
+        gitcheck.discoveryIndex = None
+        gitcheck.argopts['rescan'] = True
+        gitcheck.searchRepositories()
+
+    configure()
+    measure('searchRepositories_cold', searchCold, repeat, results)
+    measure('searchRepositories_indexed', gitcheck.searchRepositories, repeat, results)
+
+    def checkAll():
+        gitcheck.resetSnapshots()
+        for r in repos:
+            gitcheck.checkRepositoryBranches(r)
+
+    configure(jobs=1)
+    measure('checkRepository', checkAll, repeat, results)
+    configure(jobs=1, verbose=True)
+    measure('checkRepository_verbose', checkAll, repeat, results)
+
+    def updateAll():
+        gitcheck.resetSnapshots()
+        for r in repos:
+            gitcheck.updateRemote(r)
+
+    configure(jobs=1)
+    measure('updateRemote', updateAll, repeat, results)
+
+    scenarios = [
+        ('gitcheck', {}),
+        ('gitcheck_all_branches', {'checkall': True}),
+        ('gitcheck_async', {'async': True}),
+        ('gitcheck_remote', {'checkremote': True}),
+        ('gitcheck_remote_parallel', {'checkremote': True, 'parallel': True}),
+        ('gitcheck_remote_async', {'checkremote': True, 'async': True}),
+    ]
+    for name, options in scenarios:
+        configure(**options)
+        measure(name, gitcheck.gitcheck, repeat, results)
+    return results
+
+
+def gitVersion():
+    try:
+        return subprocess.run(['git', '--version'], stdout=subprocess.PIPE, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def gitcheckVersion():
+    try:
+        from importlib.metadata import version
+        return version('gitcheck')
+    except Exception:
+        return None
+
+
+def runFarm(args, farm, results):
+    """Build (or reuse) the farm and run the benchmarks on it, return the build time"""
+    root = args.farm or tempfile.mkdtemp(prefix='gitcheck-benchmark-')
+    work = os.path.join(root, 'work')
+    try:
+        build = None
+        if not os.path.isdir(work):
+            print("Building farm of %d repositories in %s" % (args.repos, root), file=sys.stderr)
+            start = time.perf_counter()
+            buildFarm(root, **farm)
+            build = round(time.perf_counter() - start, 2)
+
+        # Keep the discovery index and user settings of the real home out of the measures
+        home = os.path.join(root, 'home')
+        os.makedirs(home, exist_ok=True)
+        os.environ['HOME'] = home
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        results.update(runBenchmarks(work, args.repeat, args.jobs))
+    finally:
+        if not args.keep and not args.farm:
+            shutil.rmtree(root, ignore_errors=True)
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark gitcheck on a synthetic repository farm",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --repos 1000 --remotes 2 > before.json
+  %(prog)s --farm /tmp/farm --repeat 5      # Build once, reuse the farm later
+  %(prog)s --import-only --repeat 20        # Startup time only
+""",
+    )
+    parser.add_argument('--repos', type=int, default=100, help='number of repositories (default: 100)')
+    parser.add_argument('--remotes', type=int, default=1, help='remotes per repository (default: 1)')
+    parser.add_argument('--dirty', type=int, default=5, help='changed files of dirty repositories (default: 5)')
+    parser.add_argument('--ahead', type=int, default=3, help='local commits of repositories ahead (default: 3)')
+    parser.add_argument('--behind', type=int, default=2, help='missing commits of repositories behind (default: 2)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each measure (default: 3)')
+    parser.add_argument('--jobs', type=int, default=4, help='gitcheck --jobs for the full runs (default: 4)')
+    parser.add_argument('--farm', help='build (or reuse) the farm in this directory instead of a temporary one')
+    parser.add_argument('--keep', action='store_true', help='do not delete the temporary farm at the end')
+    parser.add_argument('--import-only', action='store_true', help='only measure the import time, without farm')
+    parser.add_argument('-o', '--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.remotes < 1 or args.repos < 1 or args.repeat < 1:
+        parser.error("--repos, --remotes and --repeat must be at least 1")
+
+    results = {}
+    measureImport(args.repeat, results)
+    farm = {k: getattr(args, k) for k in ('repos', 'remotes', 'dirty', 'ahead', 'behind')}
+    build = None
+    if args.import_only:
+        farm = None
+    else:
+        build = runFarm(args, farm, results)
+
+    report = {
+        'gitcheck': gitcheckVersion(),
+        'git': gitVersion(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'farm': None if farm is None else dict(farm, build_seconds=build),
+        'repeat': args.repeat,
+        'jobs': args.jobs,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio subprocess engine for gitcheck
+
+This module handles:
+- Running git commands with asyncio.create_subprocess_exec
+- Separate concurrency limits for network commands (remote update, pull)
+  and local commands (status, log, branch...)
+- Filling a RepoSnapshot with the outputs of concurrent git commands
+"""
+
+import asyncio
+import subprocess
+import time
+from subprocess import PIPE
+
+
+class AsyncGitExecutor:
+    """Run git commands as coroutines under global concurrency limits"""
+
+    def __init__(self, network_limit, local_limit, prefix=('git',), env=None, failure_func=None, debug=None, record=None):
+        """
+        Must be created from a running event loop.
+
+        Args:
+            network_limit: Maximum number of network git commands in flight
+            local_limit: Maximum number of local git commands in flight
+            prefix: Argv prefix of git commands
+            env: Environment of the git processes (None to inherit)
+            failure_func: Function (command, stderr bytes) -> Exception for
+                          failed commands
+            debug: Optional function called with debug messages
+            record: Optional function (path, cmd, start, duration) called
+                    after each git process (see profiling.Profiler.recordGit)
+        """
+        self.network = asyncio.Semaphore(network_limit)
+        self.local = asyncio.Semaphore(local_limit)
+        self.prefix = list(prefix)
+        self.env = env
+        self.failure = failure_func or (lambda cmd, errors: Exception(errors.decode('utf-8')))
+        self.debug = debug
+        self.record = record
+
+    async def run(self, path, cmd, timeout=None, network=False):
+        """
+        Run a git command
+
+        Args:
+            path: Repository path
+            cmd: Git arguments (without the leading 'git')
+            timeout: Timeout in seconds
+            network: Count the command against the network limit
+
+        Returns:
+            str: Decoded stdout
+
+        Raises:
+            subprocess.TimeoutExpired: The command did not finish in time
+            Exception: The command failed (built by failure_func)
+        """
+        cmdargs = self.prefix + ['-C', path] + list(cmd)
+        if self.debug:
+            self.debug("EXECUTE GIT COMMAND '%s'" % cmdargs)
+
+        async with (self.network if network else self.local):
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(*cmdargs, stdout=PIPE, stderr=PIPE, env=self.env)
+            try:
+                output, errors = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.communicate()  # Clean up
+                raise subprocess.TimeoutExpired(cmdargs, timeout)
+            finally:
+                if self.record:
+                    self.record(path, cmd, start, time.perf_counter() - start)
+
+        if proc.returncode:
+            raise self.failure(cmdargs, errors)
+        return output.decode('utf-8')
+
+    async def prefetch(self, snapshot, queries):
+        """
+        Run read-only git commands concurrently and prime a snapshot with them
+
+        Args:
+            snapshot: RepoSnapshot of the repository
+            queries: Git argument tuples, as returned by snapshot.pendingQueries()
+        """
+        outputs = await asyncio.gather(*(self.run(snapshot.path, q) for q in queries))
+        for query, output in zip(queries, outputs):
+            snapshot.prime(query, output)
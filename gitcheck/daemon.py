@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Status daemon of gitcheck (--daemon)
+
+This module handles:
+- Caching the status records of the repositories, refreshed by the daemon
+- Serving them over a local Unix socket, one JSON request and one JSON
+  response per line
+- Querying a running daemon from a client (--cached), with a short timeout
+
+Requests:
+    {"cmd": "ping"}
+    {"cmd": "status", "dirs": ["/abs/dir", ...], "options": {...}}
+Responses carry "ok" (and "error" when false). A status response holds the
+statuses (see status.statusToDict) of the repositories under dirs; it fails
+while the first refresh is running, when a dir is outside the searched
+directories of the daemon, or when the options the statuses depend on
+(verbose, all branches, untracked files, ignore regexes...) differ from
+those of the daemon, so clients can fall back to a normal run.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from os.path import expanduser
+
+from .status import statusToDict
+
+DEFAULT_SOCKET = os.path.join(expanduser('~'), '.gitcheck', 'daemon.sock')
+
+
+def available():
+    """True if the platform has Unix sockets"""
+    return getattr(socket, 'AF_UNIX', None) is not None
+
+
+def isUnder(path, directory):
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class StatusCache:
+    """Status records of the repositories, thread safe"""
+
+    def __init__(self, roots, options):
+        """
+        Args:
+            roots: Absolute paths of the directories searched by the daemon
+            options: JSON serializable dict of the options the statuses
+                     were computed with
+        """
+        self.roots = list(roots)
+        self.options = options
+        self.lock = threading.Lock()
+        self.entries = {}  # repository -> (status dicts, time.time() of the check)
+        self.ready = False
+        self.updated = None
+
+    def update(self, statuses):
+        """
+        Store fresh statuses
+
+        Args:
+            statuses: Dict repository -> list of RepoStatus
+        """
+        now = time.time()
+        entries = {rep: ([statusToDict(s) for s in found], now) for rep, found in statuses.items()}
+        with self.lock:
+            self.entries.update(entries)
+            self.updated = now
+
+    def retain(self, repositories):
+        """Forget the repositories that are not in repositories anymore"""
+        keep = set(repositories)
+        with self.lock:
+            for rep in [rep for rep in self.entries if rep not in keep]:
+                del self.entries[rep]
+
+    def markReady(self):
+        with self.lock:
+            self.ready = True
+
+    def covers(self, dirs):
+        return all(any(isUnder(d, root) for root in self.roots) for d in dirs)
+
+    def query(self, dirs):
+        """
+        Returns:
+            list: Status dicts of the repositories under dirs, in path order,
+                  with the fetch age brought up to date
+        """
+        now = time.time()
+        found = []
+        with self.lock:
+            for rep in sorted(self.entries):
+                if not any(isUnder(rep, d) for d in dirs):
+                    continue
+                statuses, checked = self.entries[rep]
+                for s in statuses:
+                    if s['fetchAge'] is not None:
+                        s = dict(s, fetchAge=s['fetchAge'] + now - checked)
+                    found.append(s)
+        return found
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = answer(self.server.cache, json.loads(line))
+            except (ValueError, AttributeError, TypeError) as e:
+                response = {'ok': False, 'error': 'invalid request: %s' % e}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+def answer(cache, request):
+    """Response dict of a request, answered from a StatusCache"""
+    cmd = request.get('cmd')
+    if cmd == 'ping':
+        return {'ok': True, 'pid': os.getpid(), 'updated': cache.updated}
+    if cmd == 'status':
+        dirs = [os.path.abspath(d) for d in request.get('dirs', [])]
+        if not cache.ready:
+            return {'ok': False, 'error': 'first refresh still running'}
+        if not cache.covers(dirs):
+            return {'ok': False, 'error': 'not searched by the daemon: %s' % ', '.join(dirs)}
+        if request.get('options') != cache.options:
+            return {'ok': False, 'error': 'statuses computed with other options: %s' % json.dumps(cache.options)}
+        return {'ok': True, 'statuses': cache.query(dirs), 'updated': cache.updated}
+    return {'ok': False, 'error': 'unknown command %r' % cmd}
+
+
+# socketserver only defines the Unix servers on platforms with Unix sockets
+if available():
+    class StatusServer(socketserver.ThreadingUnixStreamServer):
+        """Unix socket server answering from a StatusCache (one thread per client)"""
+
+        daemon_threads = True
+
+        def __init__(self, path, cache):
+            self.cache = cache
+            super().__init__(path, RequestHandler)
+
+
+def startServer(path, cache):
+    """
+    Listen on the socket path and serve the cache from a background thread
+
+    A socket left behind by a dead daemon is replaced. The socket is only
+    accessible to the user.
+
+    Args:
+        path: Socket path
+        cache: StatusCache
+
+    Returns:
+        StatusServer (see stopServer)
+
+    Raises:
+        OSError: Unix sockets are not available, or a daemon already listens
+    """
+    if not available():
+        raise OSError("Unix sockets are not available on this platform")
+    if os.path.exists(path):
+        try:
+            query(path, {'cmd': 'ping'})
+        except (OSError, ValueError):
+            os.unlink(path)
+        else:
+            raise OSError("a gitcheck daemon already listens on %s" % path)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    umask = os.umask(0o177)
+    try:
+        server = StatusServer(path, cache)
+    finally:
+        os.umask(umask)
+    threading.Thread(target=server.serve_forever, name='gitcheck-daemon', daemon=True).start()
+    return server
+
+
+def stopServer(server):
+    """Stop serving and remove the socket"""
+    server.shutdown()
+    server.server_close()
+    try:
+        os.unlink(server.server_address)
+    except OSError:
+        pass
+
+
+def query(path, request, timeout=2.0):
+    """
+    Send a request to a running daemon
+
+    Args:
+        path: Socket path
+        request: Request dict
+        timeout: Timeout in seconds of each socket operation
+
+    Returns:
+        dict: Response
+
+    Raises:
+        OSError: No daemon listens on path (or it timed out)
+        ValueError: Invalid response
+    """
+    if not available():
+        raise OSError("Unix sockets are not available on this platform")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with s.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ValueError("empty response")
+    return json.loads(line)
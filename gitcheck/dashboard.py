@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Live watch dashboard for gitcheck
+
+This module handles:
+- Showing the status of every repository in a rich.live.Live table that is
+  updated in place, without clearing the terminal
+- Keeping the previous status of each repository and only rebuilding the
+  rows whose status changed
+- A "last changed" column telling when each status last changed
+- Fitting the table to the terminal height, with a "N more" footer
+"""
+
+from contextlib import contextmanager
+from time import strftime
+
+from rich.console import Group
+from rich.live import Live
+from rich.text import Text
+
+GAP = 2
+
+
+class Dashboard:
+    """Table of per-repository status lines, refreshed only when a row changes"""
+
+    def __init__(self, console, repositories):
+        """
+        Args:
+            console: Rich console to draw on
+            repositories: Repository paths, in display order
+        """
+        self.console = console
+        self.repositories = list(repositories)
+        self.texts = {}      # repository -> status text (ANSI) as last checked
+        self.cells = {}      # repository -> lines of rich Text built from texts
+        self.changed = {}    # repository -> time of the last status change
+        self.rows = {}       # repository -> rendered lines, padded to self.width
+        self.width = 0       # width of the Repository column
+        self.timestamp = strftime('%Y-%m-%d %H:%M:%S')
+        self.live = Live(console=console, auto_refresh=False, transient=True,
+                         get_renderable=self.render)
+
+    def update(self, rows):
+        """
+        Record new status texts, refresh the screen if any row changed
+
+        Args:
+            rows: Dict repository -> status text, only for the repositories
+                  checked again
+
+        Returns:
+            list: Repositories whose status changed
+        """
+        self.timestamp = strftime('%Y-%m-%d %H:%M:%S')
+        changed = []
+        for repo, text in rows.items():
+            if self.texts.get(repo) == text:
+                continue
+            self.texts[repo] = text
+            self.cells[repo] = list(Text.from_ansi(text.rstrip('\n')).split('\n')) if text.strip() else None
+            self.changed[repo] = strftime('%H:%M:%S')
+            self.rows.pop(repo, None)
+            changed.append(repo)
+        if changed:
+            self.resize()
+        self.live.refresh()
+        return changed
+
+    def setRepositories(self, repositories):
+        """Change the displayed repositories (e.g. after a new search)"""
+        self.repositories = list(repositories)
+        keep = set(self.repositories)
+        for rows in (self.texts, self.cells, self.changed, self.rows):
+            for repo in [repo for repo in rows if repo not in keep]:
+                del rows[repo]
+        self.resize()
+
+    def resize(self):
+        """Size the Repository column to the widest status line, all rows are rebuilt when it changes"""
+        width = max((line.cell_len for lines in self.cells.values() if lines for line in lines), default=0)
+        if width != self.width:
+            self.width = width
+            self.rows.clear()
+
+    def row(self, repo):
+        """Lines of the repository, built once per status change (None when it has nothing to show)"""
+        lines = self.rows.get(repo)
+        if lines is None and self.cells.get(repo):
+            lines = []
+            for i, cell in enumerate(self.cells[repo]):
+                line = cell.copy()
+                line.no_wrap = True
+                line.overflow = 'ellipsis'
+                if i == 0:
+                    line.pad_right(self.width - cell.cell_len + GAP)
+                    line.append(self.changed.get(repo, ''), style='dim')
+                lines.append(line)
+            self.rows[repo] = lines
+        return lines
+
+    def render(self, height=None):
+        """
+        Args:
+            height: Maximum number of lines, the console height by default;
+                    the rows beyond are summed up in a "N more" footer
+        """
+        if height is None:
+            height = self.console.size.height
+        header = Text.assemble(("Repository".ljust(self.width + GAP), 'bold'), ("Last changed", 'bold'))
+        # Title, header and footer lines
+        available = max(1, height - 3)
+        lines = []
+        hidden = 0
+        for repo in self.repositories:
+            row = self.row(repo)
+            if not row:
+                continue
+            if hidden or len(lines) + len(row) > available:
+                hidden += 1
+                continue
+            lines.extend(row)
+        if hidden:
+            lines.append(Text("… %d more repositor%s" % (hidden, 'y' if hidden == 1 else 'ies'), style='dim'))
+        return Group(Text(self.timestamp, style='italic'), header, *lines)
+
+    @contextmanager
+    def suspended(self):
+        """Hide the table while something else prints (e.g. remote updates)"""
+        self.live.stop()
+        try:
+            yield
+        finally:
+            self.live.start(refresh=True)
+
+    def __enter__(self):
+        self.live.start(refresh=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.live.stop()
+        # The live table is transient, leave the last full state on screen
+        self.console.print(self.render(height=float('inf')))
+        return False
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Repository discovery for gitcheck
+
+This module handles:
+- Walking directory trees with os.scandir
+- Stopping the descent at each repository (no walk inside .git or worktrees)
+- Cutting the walk off at the maximum depth
+- Skipping directories matching exclude globs
+- Detecting .git files (worktrees and submodules) as well as .git directories
+- Finding the repository enclosing a directory, walking up instead of down
+- Persisting a discovery index so later runs only rescan changed directories
+"""
+
+import os
+import json
+import time
+from fnmatch import fnmatch
+
+from . import jsonstore
+
+
+def readGitFile(path):
+    """
+    Read the 'gitdir:' indirection of a .git file
+
+    Args:
+        path: Path of the .git file
+
+    Returns:
+        str: Absolute git directory, or None if the file is not a gitdir link
+    """
+    try:
+        with open(path, 'r') as f:
+            line = f.readline().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if not line.startswith('gitdir:'):
+        return None
+    gitdir = line[len('gitdir:'):].strip()
+    if not os.path.isabs(gitdir):
+        gitdir = os.path.join(os.path.dirname(path), gitdir)
+    return os.path.normpath(gitdir)
+
+
+def resolveGitDir(repo):
+    """
+    Find the git directory of a working tree
+
+    Args:
+        repo: Repository working tree path
+
+    Returns:
+        str: Git directory path, or None if repo is not a repository
+    """
+    dotgit = os.path.join(repo, '.git')
+    if os.path.isdir(dotgit):
+        return dotgit
+    if os.path.isfile(dotgit):
+        return readGitFile(dotgit)
+    return None
+
+
+def resolveCommonDir(gitdir):
+    """
+    Find the directory shared by all worktrees of a repository
+
+    Args:
+        gitdir: Git directory, as returned by resolveGitDir()
+
+    Returns:
+        str: Common git directory (gitdir itself outside linked worktrees)
+    """
+    try:
+        with open(os.path.join(gitdir, 'commondir'), 'r') as f:
+            commondir = f.readline().strip()
+    except OSError:
+        return gitdir
+    if not os.path.isabs(commondir):
+        commondir = os.path.join(gitdir, commondir)
+    return os.path.normpath(commondir)
+
+
+def findEnclosingRepository(path):
+    """
+    Find the working tree holding a directory, by looking for a .git entry
+    in it and then in each of its parents (no directory walk)
+
+    Args:
+        path: Directory path
+
+    Returns:
+        str: Repository working tree path, or None outside repositories
+             (and inside .git directories)
+    """
+    path = os.path.abspath(path)
+    while True:
+        if os.path.basename(path) == '.git':
+            return None
+        if resolveGitDir(path) is not None:
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def isExcluded(name, path, excludes):
+    """
+    Check a directory against exclude globs
+
+    Args:
+        name: Directory name
+        path: Full directory path
+        excludes: Glob patterns, matched against the name and the full path
+
+    Returns:
+        bool: True if the directory must be skipped
+    """
+    return any(fnmatch(name, pattern) or fnmatch(path, pattern) for pattern in excludes)
+
+
+def scanDirectory(directory):
+    """
+    List a directory in a single scandir pass
+
+    Args:
+        directory: Directory path
+
+    Returns:
+        tuple: (is_repository: bool, subdirectories: list of (name, path)),
+               or (False, []) when the directory cannot be read
+    """
+    isrepo = False
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.name == '.git':
+                        # A .git symlink to a git directory is a repository too,
+                        # only the descent into subdirectories ignores symlinks
+                        if entry.is_dir() or readGitFile(entry.path):
+                            isrepo = True
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.name, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        return False, []
+    return isrepo, subdirs
+
+
+def findRepositories(root, maxdepth=None, excludes=(), debug=None):
+    """
+    Find git repositories below a directory
+
+    Args:
+        root: Directory to search
+        maxdepth: Maximum depth of a repository below root (None for no limit)
+        excludes: Glob patterns of directories to skip
+        debug: Optional function called with debug messages
+
+    Returns:
+        list: Repository paths
+    """
+    repos = []
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        isrepo, subdirs = scanDirectory(directory)
+        if isrepo:
+            if debug:
+                debug("  Add %s repository" % directory)
+            repos.append(directory)
+            continue
+
+        if maxdepth is not None and level >= maxdepth:
+            continue
+        for name, path in subdirs:
+            if not isExcluded(name, path, excludes):
+                stack.append((path, level + 1))
+    return repos
+
+
+INDEX_VERSION = 1
+# Directories modified less than RACY_NS before a scan may change again within
+# the mtime resolution of the filesystem (2s on FAT): they are rescanned next time
+RACY_NS = 2 * 10**9
+# Roots not searched for that many seconds are dropped from the index
+INDEX_MAX_AGE = 30 * 86400
+
+
+def loadIndex(filename):
+    """
+    Load the discovery index saved by a previous run
+
+    Args:
+        filename: Index file path
+
+    Returns:
+        dict: Index data, empty if missing, unreadable or from another version
+    """
+    index = jsonstore.loadJson(filename)
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index
+
+
+def saveIndex(filename, index):
+    """
+    Atomically write the discovery index
+
+    Args:
+        filename: Index file path
+        index: Index data
+
+    Returns:
+        bool: True if saved, False on error (e.g. read-only home directory)
+    """
+    index['version'] = INDEX_VERSION
+    return jsonstore.saveJson(filename, index)
+
+
+def indexKey(root, maxdepth, excludes):
+    """Index entries are only valid for the same root, depth and excludes"""
+    return json.dumps([root, maxdepth, sorted(excludes)])
+
+
+def findRepositoriesIndexed(root, index, maxdepth=None, excludes=(), rescan=False, debug=None):
+    """
+    Find git repositories below a directory, reusing a discovery index
+
+    The index remembers the mtime, repository flag and searched subdirectories
+    of every directory walked. A directory whose mtime did not change keeps
+    its cached entry, so an unchanged tree costs one stat() per directory.
+    Entries of directories not reached anymore are dropped, and so are the
+    roots not searched for INDEX_MAX_AGE seconds.
+
+    Args:
+        root: Directory to search
+        index: Index data from loadIndex(), updated in place
+        maxdepth: Maximum depth of a repository below root (None for no limit)
+        excludes: Glob patterns of directories to skip
+        rescan: Ignore the cached entries and walk the whole tree again
+        debug: Optional function called with debug messages
+
+    Returns:
+        tuple: (repositories: list, changed: bool) where changed tells if
+               the index must be saved
+    """
+    key = indexKey(root, maxdepth, excludes)
+    roots = index.setdefault('roots', {})
+    olddirs = {} if rescan else roots.get(key, {})
+    newdirs = {}
+    changed = rescan or key not in roots
+    repos = []
+    rescanned = 0
+    started = time.time_ns()
+
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        try:
+            # Before listing: a change made while listing leaves a newer mtime
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            changed = True
+            continue
+
+        cached = olddirs.get(directory)
+        if cached is not None and cached[0] == mtime:
+            _, isrepo, children = cached
+        else:
+            changed = True
+            rescanned += 1
+            isrepo, subdirs = scanDirectory(directory)
+            children = []
+            if not isrepo and (maxdepth is None or level < maxdepth):
+                children = [path for name, path in subdirs if not isExcluded(name, path, excludes)]
+
+        # A racy mtime (None) never matches, the directory is listed again next time
+        newdirs[directory] = [mtime if mtime < started - RACY_NS else None, isrepo, children]
+        if isrepo:
+            if debug:
+                debug("  Add %s repository" % directory)
+            repos.append(directory)
+            continue
+        for path in children:
+            stack.append((path, level + 1))
+
+    if debug:
+        debug("  %d directories checked, %d rescanned" % (len(newdirs), rescanned))
+    changed = changed or newdirs.keys() != olddirs.keys()
+    roots[key] = newdirs
+    changed = pruneRoots(index, key) or changed
+    return repos, changed
+
+
+def pruneRoots(index, key):
+    """
+    Mark the root key as searched now, drop the roots of the index not
+    searched for INDEX_MAX_AGE seconds
+
+    Returns:
+        bool: True if the index changed
+    """
+    now = time.time()
+    roots = index.setdefault('roots', {})
+    used = index.setdefault('used', {})
+    changed = False
+    # Only once a day, so that unchanged trees do not rewrite the index
+    if now - used.get(key, 0) > 86400:
+        used[key] = now
+        changed = True
+    for other in list(roots):
+        if now - used.setdefault(other, now) > INDEX_MAX_AGE:
+            del roots[other]
+            del used[other]
+            changed = True
+    for other in [other for other in used if other not in roots]:
+        del used[other]
+        changed = True
+    return changed
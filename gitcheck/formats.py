@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Machine readable output formats for gitcheck
+
+This module handles:
+- Streaming one record per repository branch as JSON (a single array),
+  JSON Lines (one object per line, a.k.a. NDJSON) or CSV
+- Flushing each record as soon as it is written, so consumers see a
+  repository as soon as it has been checked
+"""
+
+import csv
+import json
+
+
+FORMATS = ('json', 'jsonl', 'csv')
+
+CSV_FIELDS = ['path', 'branch', 'changes', 'ahead', 'behind', 'fetch_age', 'action_needed', 'error']
+
+
+class JsonLinesWriter:
+    """One JSON object per line"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class JsonWriter:
+    """A JSON array, written one element at a time"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, record):
+        self.stream.write(('[\n' if self.count == 0 else ',\n') + json.dumps(record))
+        self.stream.flush()
+        self.count += 1
+
+    def close(self):
+        self.stream.write('[]\n' if self.count == 0 else '\n]\n')
+        self.stream.flush()
+
+
+class CsvWriter:
+    """CSV with a header line, per-remote counts as 'remote=count' lists"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+        self.stream.flush()
+
+    def write(self, record):
+        row = dict(record)
+        remotes = record.get('remotes') or {}
+        row['ahead'] = ';'.join('%s=%d' % (r, c['ahead']) for r, c in remotes.items())
+        row['behind'] = ';'.join('%s=%d' % (r, c['behind']) for r, c in remotes.items())
+        for key in ('fetch_age', 'error', 'branch'):
+            if row.get(key) is None:
+                row[key] = ''
+        self.writer.writerow(row)
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+def createWriter(fmt, stream):
+    """
+    Create a record writer
+
+    Args:
+        fmt: One of FORMATS
+        stream: Text stream to write to
+
+    Returns:
+        Writer with write(record) and close() methods
+    """
+    if fmt == 'json':
+        return JsonWriter(stream)
+    if fmt == 'jsonl':
+        return JsonLinesWriter(stream)
+    if fmt == 'csv':
+        return CsvWriter(stream)
+    raise ValueError("Unknown format: %s" % fmt)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import re
 import sys
@@ -8,63 +9,64 @@ import getopt
 import time
 import subprocess
 from subprocess import PIPE
-import smtplib
-from smtplib import SMTPException
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import shlex
 from os.path import expanduser
 from time import strftime
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from contextlib import nullcontext
 
 from rich.console import Console
-from rich.prompt import Prompt, Confirm
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
-from . import https_utils
+# Startup matters (shell prompts run gitcheck constantly): asyncio, email,
+# prompts, progress bars, the live dashboard and the HTTPS helpers are
+# imported by the functions using them
+from . import discovery
+from . import scheduler
+from . import watch
+from . import formats
+from . import jsonstore
+from .snapshot import RepoSnapshot
+from .refs import applyRefspecs
+from .status import RepoStatus, RemoteStatus, failedStatus, statusFromDict
+from . import render
+from .render import formatAge
+from .report import HtmlReport
+from .profiling import Profiler
 
 console = Console()
 console_lock = threading.Lock()
+snapshots = {}
+snapshots_lock = threading.Lock()
+discoveryIndex = None
+gitContext = None
+checkTimes = None
+checkTimes_lock = threading.Lock()
+checkTimesChanged = False
 
 # Global vars
 argopts = {}
 colortheme = None
-#Load custom parameters from ~/mygitcheck.py
+#Custom parameters are loaded from ~/mygitcheck.py on first use (see getColortheme)
 configfile = expanduser('~/mygitcheck.py')
-if os.path.exists(configfile):
-    sys.path.append(expanduser('~'))
-    import mygitcheck as userconf
-
-    # Try to load colortheme
-    if hasattr(userconf, 'colortheme'):
-        colortheme = userconf.colortheme
-if colortheme is None:
-    # Default theme using rich colors
-    colortheme = {
-        'default': 'white',
-        'prjchanged': 'bold deep_pink1',
-        'prjremote': 'magenta',
-        'prjname': 'chartreuse1',
-        'reponame': 'light_goldenrod2',
-        'branchname': 'white',
-        'fileupdated': 'light_goldenrod2',
-        'remoteto': 'deep_sky_blue3',
-        'committo': 'violet',
-        'commitinfo': 'deep_sky_blue3',
-        'commitstate': 'deep_pink1',
-    }
-
-
-class html:
-    msg = "<ul>\n"
-    topull = ""
-    topush = ""
-    strlocal = ""
-    prjname = ""
-    path = ""
-    timestamp = ""
+# Default theme using rich colors
+defaultColortheme = {
+    'default': 'white',
+    'prjchanged': 'bold deep_pink1',
+    'prjremote': 'magenta',
+    'prjname': 'chartreuse1',
+    'reponame': 'light_goldenrod2',
+    'branchname': 'white',
+    'fileupdated': 'light_goldenrod2',
+    'remoteto': 'deep_sky_blue3',
+    'committo': 'violet',
+    'commitinfo': 'deep_sky_blue3',
+    'commitstate': 'deep_pink1',
+}
+
+
+htmlReport = HtmlReport()
+profiler = Profiler()
 
 
 def showDebug(mess, level='info'):
@@ -72,210 +74,579 @@ def showDebug(mess, level='info'):
         console.print(f"[dim]{mess}[/dim]")
 
 
+def getColortheme():
+    """Get the color theme, importing ~/mygitcheck.py on first use"""
+    global colortheme
+    if colortheme is None:
+        theme = None
+        if os.path.exists(configfile):
+            sys.path.append(expanduser('~'))
+            import mygitcheck as userconf
+
+            # Try to load colortheme
+            if hasattr(userconf, 'colortheme'):
+                theme = userconf.colortheme
+        colortheme = theme if theme is not None else defaultColortheme
+    return colortheme
+
+
 # Search all local repositories from current directory
 def searchRepositories():
     showDebug('Beginning scan... building list of git folders')
+    global discoveryIndex
     dirs = argopts.get('searchDir', [os.path.abspath(os.getcwd())])
+    indexfile = os.path.join(expanduser('~'), '.gitcheck', 'index.json')
+    if discoveryIndex is None:
+        discoveryIndex = discovery.loadIndex(indexfile)
+
     repo = set()
+    changed = False
     for curdir in dirs:
         if curdir[-1:] == '/':
             curdir = curdir[:-1]
+        curdir = os.path.abspath(curdir)
         showDebug("  Scan git repositories from %s" % curdir)
 
-        html.path = curdir
-        startinglevel = curdir.count(os.sep)
+        found, rootchanged = discovery.findRepositoriesIndexed(
+            curdir,
+            discoveryIndex,
+            maxdepth=argopts.get('depth', None),
+            excludes=argopts.get('exclude', []),
+            rescan=argopts.get('rescan', False),
+            debug=showDebug,
+        )
+        repo.update(found)
+        changed = changed or rootchanged
 
-        for directory, dirnames, filenames in os.walk(curdir):
-            level = directory.count(os.sep) - startinglevel
-            if argopts.get('depth', None) is None or level <= argopts.get('depth', None):
-                if '.git' in dirnames:
-                    showDebug("  Add %s repository" % directory)
-                    repo.add(directory)
+    # Only the first run of watch mode needs a full rescan
+    argopts['rescan'] = False
+    if changed and not discovery.saveIndex(indexfile, discoveryIndex):
+        showDebug("  Could not save discovery index %s" % indexfile)
 
     showDebug('Done')
     return sorted(repo)
 
 
-# Check state of a git repository
-def checkRepository(rep, branch):
-    aitem = []
-    mitem = []
-    ditem = []
-    gsearch = re.compile(r'^.?([A-Z]) (.*)')
+def repositoryStatus(rep, branch):
+    """Status stage: compute the RepoStatus of one branch of a repository
 
+    Returns None when the branch is ignored (--ignore-branch). Only reads
+    the repository, so it can run on any worker.
+    """
     if re.match(argopts.get('ignoreBranch', r'^$'), branch):
+        return None
+
+    verbose = argopts.get('verbose', False)
+    changes = tuple((c[0], c[1]) for c in getRepositoryStatus(rep)['changes'])
+    hasremotes = False
+    remotes = []
+    if branch != "":
+        names = getRemoteRepositories(rep)
+        hasremotes = bool(names)
+        for r in names:
+            ahead, behind = getAheadBehind(rep, r, branch)
+            topush = tuple(getLocalToPush(rep, r, branch)) if verbose and ahead else ()
+            topull = tuple(getRemoteToPull(rep, r, branch)) if verbose and behind else ()
+            remotes.append(RemoteStatus(r, ahead, behind, topush, topull))
+    return RepoStatus(rep, branch, changes, hasremotes, tuple(remotes), getFetchAge(rep), None)
+
+
+def repositoryStatuses(rep):
+    """RepoStatus of each checked branch of a repository"""
+    statuses = (repositoryStatus(rep, b) for b in selectBranches(rep))
+    return [s for s in statuses if s is not None]
+
+
+def renderStatus(status, out=None, report=None):
+    """Render a RepoStatus on the terminal, or as html for the email report
+
+    Output goes to ``out`` (the global console by default) and the html
+    fragments are appended to ``report`` when given, or to the run's
+    htmlReport otherwise.
+    """
+    if out is None:
+        out = console
+    if not status.isChange and argopts.get('quiet', False):
+        return
+    name = render.displayName(status.path)
+    showAge = argopts.get('fetch_ttl') is not None
+    with profiler.phase('render'):
+        if argopts.get('email', False):
+            msg = render.renderHtml(status, name, argopts.get('verbose', False), showAge)
+            if report is None:
+                htmlReport.extend(msg)
+            else:
+                report.extend(msg)
+        else:
+            render.renderTerminal(status, out, getColortheme(), name, argopts.get('verbose', False), showAge)
+
+
+# Check state of a git repository
+def checkRepository(rep, branch, out=None, report=None):
+    """Check one branch of a repository and render its status, return True if action is needed"""
+    status = repositoryStatus(rep, branch)
+    if status is None:
         return False
+    renderStatus(status, out=out, report=report)
+    return status.actionNeeded
 
-    changes = getLocalFilesChange(rep)
-    ischange = len(changes) > 0
-    actionNeeded = False  # actionNeeded is branch push/pull, not local file change.
 
-    topush = ""
-    topull = ""
-    html.topush = ""
-    html.topull = ""
-    if branch != "":
-        remotes = getRemoteRepositories(rep)
-        hasremotes = bool(remotes)
-        for r in remotes:
-            count = len(getLocalToPush(rep, r, branch))
-            ischange = ischange or (count > 0)
-            actionNeeded = actionNeeded or (count > 0)
-            if count > 0:
-                topush += f" [{colortheme['reponame']}]{r}[/][[{colortheme['remoteto']}]To Push:[/]{count}]"
-                html.topush += '<b style="color:black">%s</b>[<b style="color:blue">To Push:</b><b style="color:black">%s</b>]' % (
-                    r,
-                    count
-                )
+def selectBranches(rep):
+    """Branches to check: all of them with -a, the current one otherwise"""
+    if argopts.get('checkall', False):
+        return getAllBranches(rep)
+    return getDefaultBranch(rep)
+
+
+def checkRepositoryBranches(rep, out=None, report=None):
+    """Check the selected branches of a repository, return True if action is needed"""
+    actionNeeded = False
+    for status in repositoryStatuses(rep):
+        renderStatus(status, out=out, report=report)
+        if status.actionNeeded:
+            actionNeeded = True
+    return actionNeeded
+
+
+def bufferedCheckRepository(rep):
+    """Check a repository on a worker thread, capturing its console and html output"""
+    buf = io.StringIO()
+    out = Console(
+        file=buf,
+        width=console.width,
+        color_system=console.color_system,
+        force_terminal=console.is_terminal,
+        no_color=console.no_color,
+    )
+    report = []
+    actionNeeded = False
+    # A repository failing to check (e.g. deleted while watched) shows as an error row
+    for status in checkedStatuses(rep):
+        renderStatus(status, out=out, report=report)
+        if status.actionNeeded:
+            actionNeeded = True
+    return actionNeeded, buf.getvalue(), report
+
+
+def initStatusWorker(options, context, profiling=False):
+    """Set up a --processes worker (options are not inherited with the spawn start method)"""
+    global gitContext
+    argopts.clear()
+    argopts.update(options)
+    gitContext = context
+    if profiling:
+        profiler.enable()
+
+
+def profiledStatus(function, rep):
+    """Run function(rep) in a --processes worker, returning the git processes it ran along (--profile)"""
+    result = function(rep)
+    return result, profiler.takeCommands()
+
+
+def profilingWorkers():
+    return argopts.get('processes', 0) > 0 and profiler.enabled
+
+
+def submitStatus(executor, function, rep):
+    """Submit function(rep) to a pool of newStatusExecutor, read the result with statusResult"""
+    if profilingWorkers():
+        return executor.submit(profiledStatus, function, rep)
+    return executor.submit(function, rep)
+
+
+def statusResult(future):
+    """Result of a submitStatus future, the git processes of a worker are merged in the profiler"""
+    result = future.result()
+    if profilingWorkers():
+        result, commands = result
+        profiler.mergeCommands(commands)
+    return result
+
+
+def newStatusExecutor(count):
+    """Pool running the status stage for count repositories, one task per repository: processes with --processes, threads otherwise"""
+    processes = argopts.get('processes', 0)
+    if processes > 0:
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(
+            max_workers=max(1, min(processes, count)),
+            initializer=initStatusWorker,
+            initargs=(dict(argopts), getGitContext(), profiler.enabled),
+        )
+    return ThreadPoolExecutor(max_workers=max(1, min(argopts.get('jobs', 4), count)))
 
-        for r in remotes:
-            count = len(getRemoteToPull(rep, r, branch))
-            ischange = ischange or (count > 0)
-            actionNeeded = actionNeeded or (count > 0)
-            if count > 0:
-                topull += f" [{colortheme['reponame']}]{r}[/][[{colortheme['remoteto']}]To Pull:[/]{count}]"
-                html.topull += '<b style="color:black">%s</b>[<b style="color:blue">To Pull:</b><b style="color:black">%s</b>]' % (
-                    r,
-                    count
+
+def checkRepositories(repositories):
+    """Run the local status phase over a bounded worker pool
+
+    Workers only compute RepoStatus records; they are rendered here, in the
+    (sorted) order of ``repositories``, so the report stays deterministic.
+    """
+    actionNeeded = False
+    max_workers = argopts.get('jobs', 4)
+
+    if (max_workers <= 1 and not argopts.get('processes', 0)) or len(repositories) <= 1:
+        for r in repositories:
+            if checkRepositoryBranches(r):
+                actionNeeded = True
+        return actionNeeded
+
+    with newStatusExecutor(len(repositories)) as executor:
+        futures = [submitStatus(executor, repositoryStatuses, r) for r in repositories]
+        try:
+            for future in futures:
+                for status in statusResult(future):
+                    with console_lock:
+                        renderStatus(status)
+                    if status.actionNeeded:
+                        actionNeeded = True
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+    return actionNeeded
+
+
+def checkRows(repositories):
+    """Check repositories over the worker pool, return their buffered results in order"""
+    max_workers = max(1, min(argopts.get('jobs', 4), len(repositories)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(bufferedCheckRepository, repositories))
+
+
+def drawRows(repositories, rows):
+    """Redraw the watch screen from the cached output of each repository"""
+    with console_lock:
+        console.clear()
+        console.print(f"[bold]{strftime('%Y-%m-%d %H:%M:%S')}[/bold]")
+        for r in repositories:
+            console.file.write(rows.get(r, ''))
+        console.file.flush()
+
+
+def watchRepositories():
+    """Incremental watch mode (-w with --events and/or --live)
+
+    The first pass checks every repository. With --events, only the
+    repositories whose working tree, HEAD or refs changed are checked again
+    afterwards; without it, every repository is checked at each interval.
+    Every interval, the directories are searched again: new repositories are
+    checked and watched, the vanished ones are dropped. With -r, remotes are
+    still updated every interval; the fetched refs show up as changes. The screen is redrawn from the cached output of the other
+    repositories, or with --live, only the changed rows of a live table are
+    rebuilt.
+    """
+    interval = argopts.get('watchInterval', 0)
+    resetSnapshots()
+    repo = searchRepositories()
+    if argopts.get('checkremote', False):
+        updateRepositories(repo)
+
+    if argopts.get('live', False):
+        from .dashboard import Dashboard
+        live = Dashboard(console, repo)
+    else:
+        live = nullcontext()
+    watcher = None
+    rows = {}
+    actions = {}
+    changed = set(repo)
+    updated = True
+    nextUpdate = time.monotonic() + interval
+    try:
+        with live:
+            while True:
+                if changed or updated:
+                    showDebug("Changed repositories: %s" % sorted(changed))
+                    ordered = [r for r in repo if r in changed]
+                    for r in ordered:
+                        getSnapshot(r).invalidate()
+                    results = checkRows(ordered)
+                    for r, (actionNeeded, text, _) in zip(ordered, results):
+                        rows[r] = text
+                        actions[r] = actionNeeded
+                    if argopts.get('live', False):
+                        live.update({r: rows[r] for r in ordered})
+                    else:
+                        drawRows(repo, rows)
+                    if any(actions[r] for r in ordered) and argopts.get('bellOnActionNeeded', False):
+                        console.bell()
+
+                if watcher is None and argopts.get('watch_events', False):
+                    watcher = watch.createWatcher(
+                        repo,
+                        debug=showDebug if argopts.get('debugmod', False) else None,
+                        excludes=argopts.get('exclude', []),
+                    )
+
+                timeout = max(0, nextUpdate - time.monotonic())
+                if watcher is not None:
+                    changed = watcher.wait(timeout)
+                else:
+                    time.sleep(timeout)
+                    changed = set(repo)
+                updated = False
+                if time.monotonic() >= nextUpdate:
+                    resetSnapshots()
+                    found = searchRepositories()
+                    if found != repo:
+                        showDebug("Repositories added: %s, removed: %s" % (
+                            sorted(set(found) - set(repo)), sorted(set(repo) - set(found))))
+                        for r in set(repo) - set(found):
+                            rows.pop(r, None)
+                            actions.pop(r, None)
+                        changed |= set(found) - set(repo)
+                        repo = found
+                        if watcher is not None:
+                            try:
+                                watcher.setRepositories(repo)
+                            except OSError:
+                                # inotify limit reached: recreated below, polling if need be
+                                watcher.close()
+                                watcher = None
+                                changed |= set(repo)
+                        if argopts.get('live', False):
+                            live.setRepositories(repo)
+                        updated = True
+                    if argopts.get('checkremote', False):
+                        with live.suspended() if argopts.get('live', False) else nullcontext():
+                            updateRepositories(repo)
+                        if watcher is not None:
+                            changed |= watcher.wait(0)
+                        updated = True
+                    nextUpdate = time.monotonic() + interval
+    finally:
+        if watcher is not None:
+            watcher.close()
+
+
+def checkedStatuses(rep):
+    """repositoryStatuses, or a failed status when the check raises"""
+    try:
+        return repositoryStatuses(rep)
+    except Exception as e:
+        return [failedStatus(rep, e)]
+
+
+def recordShown(status):
+    """Quiet filter of the --format records (failed checks are always shown)"""
+    return status.isChange or status.error is not None or not argopts.get('quiet', False)
+
+
+def repositoryRecords(rep):
+    """Machine readable status of a repository (--format), one record per checked branch"""
+    return [render.renderRecord(s) for s in checkedStatuses(rep) if recordShown(s)]
+
+
+def writeRepositoryRecords(repositories):
+    """Stream the --format records of repositories to stdout, each repository as soon as it is checked"""
+    writer = formats.createWriter(argopts['format'], sys.stdout)
+    actionNeeded = False
+    try:
+        with newStatusExecutor(len(repositories)) as executor:
+            futures = [submitStatus(executor, repositoryRecords, r) for r in repositories]
+            try:
+                for future in as_completed(futures):
+                    for record in statusResult(future):
+                        writer.write(record)
+                        actionNeeded = actionNeeded or record['action_needed']
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        writer.close()
+    return actionNeeded
+
+
+def computeStatuses(repositories):
+    """Statuses of repositories computed over the worker pool, as a dict repository -> list"""
+    if not repositories:
+        return {}
+    with newStatusExecutor(len(repositories)) as executor:
+        futures = [submitStatus(executor, checkedStatuses, r) for r in repositories]
+        return {r: statusResult(future) for r, future in zip(repositories, futures)}
+
+
+def serveRepositories():
+    """Daemon mode (--daemon)
+
+    Keeps the statuses of the searched repositories in memory and serves
+    them on a Unix socket (see daemon.py). Repositories whose working tree,
+    HEAD or refs changed are checked again as soon as the watcher reports
+    them. Every -w seconds (60 by default), the directories are searched
+    again, the remotes are updated with -r, and every repository is checked.
+    """
+    import signal
+    from . import daemon
+
+    interval = argopts.get('watchInterval', 0) or 60
+    path = argopts.get('socket') or daemon.DEFAULT_SOCKET
+    roots = [os.path.abspath(d) for d in argopts.get('searchDir', [os.getcwd()])]
+    cache = daemon.StatusCache(roots, statusOptions())
+    try:
+        server = daemon.startServer(path, cache)
+    except OSError as e:
+        console.print(f"[red]Cannot start the daemon: {e}[/red]")
+        sys.exit(1)
+    console.print(f"[cyan]Serving the status of {', '.join(roots)} on {path}[/cyan]")
+    # Service managers stop daemons with SIGTERM: leave through the finally below
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    watcher = None
+    repo = []
+    changed = set()
+    nextUpdate = 0
+    try:
+        while True:
+            if time.monotonic() >= nextUpdate:
+                resetSnapshots()
+                found = searchRepositories()
+                if found != repo and watcher is not None:
+                    watcher.close()
+                    watcher = None
+                repo = found
+                if argopts.get('checkremote', False):
+                    updateRepositories(repo)
+                cache.retain(repo)
+                changed = set(repo)
+                nextUpdate = time.monotonic() + interval
+
+            ordered = [r for r in repo if r in changed]
+            if ordered:
+                for r in ordered:
+                    getSnapshot(r).invalidate()
+                cache.update(computeStatuses(ordered))
+                console.print(f"[dim]{strftime('%H:%M:%S')} checked {len(ordered)} of {len(repo)} repositories[/dim]")
+            cache.markReady()
+
+            if watcher is None:
+                watcher = watch.createWatcher(
+                    repo,
+                    debug=showDebug if argopts.get('debugmod', False) else None,
+                    excludes=argopts.get('exclude', []),
                 )
-    if ischange or not argopts.get('quiet', False):
-        # Remove trailing slash from repository/directory name
-        if rep[-1:] == '/':
-            rep = rep[:-1]
-
-        # Do some magic to not show the absolute path as repository name
-        # Case 1: script was started in a directory that is a git repo
-        if rep == os.path.abspath(os.getcwd()):
-            (head, tail) = os.path.split(rep)
-            if tail != '':
-                repname = tail
-        # Case 2: script was started in a directory with possible subdirs that contain git repos
-        elif rep.find(os.path.abspath(os.getcwd())) == 0:
-            repname = rep[len(os.path.abspath(os.getcwd())) + 1:]
-        # Case 3: script was started with -d and above cases do not apply
-        else:
-            repname = rep
-
-        if ischange:
-            prjname = "%s%s%s" % (colortheme['prjchanged'], repname, colortheme['default'])
-            html.prjname = '<b style="color:red">%s</b>' % (repname)
-        elif not hasremotes:
-            prjname = "%s%s%s" % (colortheme['prjremote'], repname, colortheme['default'])
-            html.prjname = '<b style="color:magenta">%s</b>' % (repname)
-        else:
-            prjname = "%s%s%s" % (colortheme['prjname'], repname, colortheme['default'])
-            html.prjname = '<b style="color:green">%s</b>' % (repname)
+            changed = watcher.wait(max(0, nextUpdate - time.monotonic()))
+    finally:
+        if watcher is not None:
+            watcher.close()
+        daemon.stopServer(server)
+
+
+def statusOptions():
+    """Options the statuses depend on, compared between --daemon and --cached"""
+    ignoreLocal = argopts.get('ignoreLocal', r'^$')
+    return {
+        'verbose': argopts.get('verbose', False),
+        'all_branches': argopts.get('checkall', False),
+        'untracked': argopts.get('checkUntracked', False),
+        'ignore_local': getattr(ignoreLocal, 'pattern', ignoreLocal),
+        'ignore_branch': argopts.get('ignoreBranch', r'^$'),
+        'max_commits': argopts.get('max_commits'),
+    }
 
-        # Print result
-        if len(changes) > 0:
-            lenFilesChanged = len(getLocalFilesChange(rep))
-            strlocal = f"[{colortheme['reponame']}]Local[/][[{colortheme['remoteto']}]To Commit:[/]{lenFilesChanged}]"
-            html.strlocal = '<b style="color:orange"> Local</b><b style="color:black">['
-            html.strlocal += "To Commit:%s" % (
-                lenFilesChanged
+
+def cachedStatuses():
+    """Statuses of the searched directories from a running daemon (--cached), None when it cannot answer"""
+    from . import daemon
+
+    path = argopts.get('socket') or daemon.DEFAULT_SOCKET
+    dirs = [os.path.abspath(d) for d in argopts.get('searchDir', [os.getcwd()])]
+    try:
+        response = daemon.query(path, {'cmd': 'status', 'dirs': dirs, 'options': statusOptions()})
+    except (OSError, ValueError) as e:
+        showDebug(f"No gitcheck daemon on {path} ({e}), checking the repositories")
+        return None
+    if not response.get('ok', False):
+        showDebug(f"The gitcheck daemon cannot answer ({response.get('error')}), checking the repositories")
+        return None
+    return [statusFromDict(s) for s in response['statuses']]
+
+
+def renderStatuses(statuses):
+    """Render statuses computed elsewhere (--cached), return True if action is needed"""
+    if argopts.get('format'):
+        writer = formats.createWriter(argopts['format'], sys.stdout)
+        try:
+            for s in statuses:
+                if recordShown(s):
+                    writer.write(render.renderRecord(s))
+        finally:
+            writer.close()
+    else:
+        for s in statuses:
+            renderStatus(s)
+    return any(s.actionNeeded for s in statuses)
+
+
+def getSnapshot(rep):
+    """Get the RepoSnapshot caching git answers for this repository during the run"""
+    with snapshots_lock:
+        snapshot = snapshots.get(rep)
+        if snapshot is None:
+            snapshot = RepoSnapshot(
+                rep,
+                gitExec,
+                untracked=argopts.get('checkUntracked', False),
+                ignoreLocal=argopts.get('ignoreLocal', r'^$'),
+                maxCommits=argopts.get('max_commits'),
             )
-            html.strlocal += "]</b>"
-        else:
-            strlocal = ""
-            html.strlocal = ""
+            snapshots[rep] = snapshot
+        return snapshot
 
-        if argopts.get('email', False):
-            html.msg += "<li>%s/%s %s %s %s</li>\n" % (html.prjname, branch, html.strlocal, html.topush, html.topull)
 
-        else:
-            cbranch = f"[{colortheme['branchname']}]{branch}[/]"
-            prjname_styled = f"[{colortheme['prjname'] if not ischange else colortheme['prjchanged'] if hasremotes else colortheme['prjremote']}]{repname}[/]"
-            console.print(f"{prjname_styled}/{cbranch} {strlocal}{topush}{topull}")
-
-        if argopts.get('verbose', False):
-            if ischange > 0:
-                if not argopts.get('email', False):
-                    console.print("  [bold]|--Local[/bold]")
-                html.msg += '<ul><li><b>Local</b></li></ul>\n<ul>\n'
-                for c in changes:
-                    html.msg += '<li> <b style="color:orange">[To Commit] </b>%s</li>\n' % c[1]
-                    if not argopts.get('email', False):
-                        console.print(f"     |--[{colortheme['commitstate']}]{c[0]}[/] [{colortheme['fileupdated']}]{c[1]}[/]")
-                html.msg += '</ul>\n'
-            if branch != "":
-                remotes = getRemoteRepositories(rep)
-                for r in remotes:
-                    commits = getLocalToPush(rep, r, branch)
-                    if len(commits) > 0:
-                        html.msg += '<ul><li><b>%(r)s</b></li>\n</ul>\n<ul>\n' % locals()
-                        if not argopts.get('email', False):
-                            console.print(f"  |--{r}")
-                        for commit in commits:
-                            html.msg += '<li><b style="color:blue">[To Push] </b>%s</li>\n' % commit
-                            if not argopts.get('email', False):
-                                console.print(f"     |--[{colortheme['committo']}][To Push][/] [{colortheme['commitinfo']}]{commit}[/]")
-                        html.msg += '</ul>\n'
-
-            if branch != "":
-                remotes = getRemoteRepositories(rep)
-                for r in remotes:
-                    commits = getRemoteToPull(rep, r, branch)
-                    if len(commits) > 0:
-                        html.msg += '<ul><li><b>%(r)s</b></li>\n</ul>\n<ul>\n' % locals()
-                        if not argopts.get('email', False):
-                            console.print(f"  |--{r}")
-                        for commit in commits:
-                            html.msg += '<li><b style="color:blue">[To Pull] </b>%s</li>\n' % commit
-                            if not argopts.get('email', False):
-                                console.print(f"     |--[{colortheme['committo']}][To Pull][/] [{colortheme['commitinfo']}]{commit}[/]")
-                        html.msg += '</ul>\n'
+def resetSnapshots():
+    """Forget the cached git answers of the previous run"""
+    with snapshots_lock:
+        snapshots.clear()
 
-    return actionNeeded
 
+def repoExec(rep, cmd, timeout=None):
+    """Run a git command that changes the repository and invalidate its snapshot"""
+    return getSnapshot(rep).execute(cmd, timeout=timeout)
 
-def getLocalFilesChange(rep):
-    files = []
-    #curdir = os.path.abspath(os.getcwd())
-    snbchange = re.compile(r'^(.{2}) (.*)')
-    onlyTrackedArg = "" if argopts.get('checkUntracked', False) else "uno"
-    result = gitExec(rep, "status -s" + onlyTrackedArg)
 
-    lines = result.split('\n')
-    for line in lines:
-        if not re.match(argopts.get('ignoreLocal', r'^$'), line):
-            m = snbchange.match(line)
-            if m:
-                files.append([m.group(1), m.group(2)])
+def getRepositoryStatus(rep):
+    """Get file changes, upstream and ahead/behind counts with one git call"""
+    return getSnapshot(rep).status()
+
 
-    return files
+def getLocalFilesChange(rep):
+    return getRepositoryStatus(rep)['changes']
 
 
 def hasRemoteBranch(rep, remote, branch):
-    result = gitExec(rep, 'branch -r')
-    return '%s/%s' % (remote, branch) in result
+    return getSnapshot(rep).hasRemoteBranch(remote, branch)
+
+
+def getAheadBehind(rep, remote, branch):
+    """Return (ahead, behind) commit counts of branch against remote/branch"""
+    return getSnapshot(rep).aheadBehind(remote, branch)
 
 
 def getLocalToPush(rep, remote, branch):
     if not hasRemoteBranch(rep, remote, branch):
         return []
-    result = gitExec(rep, "log %(remote)s/%(branch)s..%(branch)s --oneline"
-                     % locals())
-
-    return [x for x in result.split('\n') if x]
+    return getSnapshot(rep).log("%(remote)s/%(branch)s..%(branch)s" % locals())
 
 
 def getRemoteToPull(rep, remote, branch):
     if not hasRemoteBranch(rep, remote, branch):
         return []
-    result = gitExec(rep, "log %(branch)s..%(remote)s/%(branch)s --oneline"
-                     % locals())
-
-    return [x for x in result.split('\n') if x]
+    return getSnapshot(rep).log("%(branch)s..%(remote)s/%(branch)s" % locals())
 
 
 def convertRemoteToHttps(rep, remote_name='origin', force_update=False):
     """Convert git:// or SSH remote URLs to HTTPS for firewall compatibility"""
     gitlab_token = os.environ.get('GITLAB_TOKEN', '').strip()
-    return https_utils.convertRemoteToHttps(rep, remote_name, gitlab_token, gitExec, force_update=force_update)
+    from . import https_utils
+    return https_utils.convertRemoteToHttps(rep, remote_name, gitlab_token, repoExec, force_update=force_update)
 
 
 def promptForNewToken(reason="expired or invalid"):
     """Prompt user for a new token and save it"""
+    from . import https_utils
     new_token = https_utils.promptForNewToken(console, console_lock, reason)
     if new_token:
         # Save to environment for current process
@@ -287,6 +658,7 @@ def promptForNewToken(reason="expired or invalid"):
 
 def ensureHttpsRemotes(rep, force_update=False):
     """Ensure all remotes use HTTPS URLs"""
+    from . import https_utils
     return https_utils.ensureHttpsRemotes(
         rep,
         getRemoteRepositories,
@@ -298,7 +670,211 @@ def ensureHttpsRemotes(rep, force_update=False):
     )
 
 
+def fetchCommands(rep, remotes=None):
+    """Git commands updating the remotes of a repository, following --fetch
+
+    'update' (the default) runs `git remote update`, or `git fetch --all`
+    when fetch options are given, or `git fetch --multiple --jobs=N` over
+    all remotes with --fetch-jobs. 'targeted' fetches, from each remote,
+    only the branches gitcheck compares (the current one, or all with -a).
+    With remotes (e.g. from --ls-remote), only those remotes are fetched.
+    """
+    options = []
+    if argopts.get('fetch_no_tags', False):
+        options.append('--no-tags')
+    if argopts.get('fetch_prune', False):
+        options.append('--prune')
+    if argopts.get('fetch_submodules', False):
+        options.append('--recurse-submodules')
+    fetchJobs = argopts.get('fetch_jobs', 1)
+    if fetchJobs > 1:
+        # Fetches remotes (--multiple) and submodules concurrently
+        options.append('--jobs=%d' % fetchJobs)
+    fetchFilter = argopts.get('fetch_filter')
+
+    if argopts.get('fetch_mode', 'update') != 'targeted':
+        if remotes is not None:
+            return [['fetch', '--multiple'] + options + list(remotes)]
+        remotes = getRemoteRepositories(rep)
+        if fetchJobs > 1 and len(remotes) > 1:
+            return [['fetch', '--multiple'] + options + remotes]
+        if options or fetchFilter:
+            return [['fetch', '--all'] + options]
+        return [['remote', 'update']]
+
+    snapshot = getSnapshot(rep)
+    config = snapshot.config()
+    branches = [b for b in selectBranches(rep) if b]
+    commands = []
+    for remote in snapshot.remotes():
+        if remotes is not None and remote not in remotes:
+            continue
+        refspecs = [
+            '+refs/heads/%s:refs/remotes/%s/%s' % (b, remote, b)
+            for b in branches if snapshot.hasRemoteBranch(remote, b)
+        ]
+        if not refspecs:
+            continue
+        cmd = ['fetch'] + options
+        # A filter only applies to partial clones (promisor remotes)
+        if fetchFilter and config.get('remote.%s.promisor' % remote) == 'true':
+            cmd.append('--filter=%s' % fetchFilter)
+        commands.append(cmd + [remote] + refspecs)
+    return commands
+
+
+def fetchRemotes(rep, timeout=30, remotes=None):
+    """Update the remotes of a repository, return the git output"""
+    commands = fetchCommands(rep, remotes)
+    fetchJobs = argopts.get('fetch_jobs', 1)
+    if fetchJobs > 1 and len(commands) > 1:
+        # Targeted fetches cannot be batched with --multiple, run them side by side
+        with ThreadPoolExecutor(max_workers=min(fetchJobs, len(commands))) as executor:
+            outputs = executor.map(lambda cmd: repoExec(rep, cmd, timeout=timeout), commands)
+            return ''.join(outputs)
+
+    output = ""
+    for cmd in commands:
+        output += repoExec(rep, cmd, timeout=timeout)
+    return output
+
+
+def lsRemoteCommand(remote):
+    return ['ls-remote', '--heads', remote]
+
+
+def parseLsRemote(output):
+    """Branches advertised by `git ls-remote --heads`, branch name -> sha"""
+    refs = {}
+    for line in output.splitlines():
+        sha, _, ref = line.partition('\t')
+        if ref.startswith('refs/heads/'):
+            refs[ref[len('refs/heads/'):]] = sha
+    return refs
+
+
+def movedRemotes(rep, advertised):
+    """
+    Compare the branches advertised by the remotes with the local
+    remote-tracking branches
+
+    In update mode, the advertised branches go through the fetch refspecs
+    of the remote: branches a single-branch, shallow or narrowed clone does
+    not fetch are left out.
+
+    Args:
+        rep: Repository path
+        advertised: Dict remote -> `git ls-remote --heads` output
+
+    Returns:
+        list: Remotes with a branch to fetch (new or moved, or deleted with --prune)
+    """
+    snapshot = getSnapshot(rep)
+    targeted = argopts.get('fetch_mode', 'update') == 'targeted'
+    branches = [b for b in selectBranches(rep) if b] if targeted else None
+    moved = []
+    for remote, output in advertised.items():
+        remoteRefs = parseLsRemote(output)
+        localRefs = snapshot.remoteRefs(remote)
+        if branches is not None:
+            # Targeted fetches only bring the compared branches
+            remoteRefs = {b: s for b, s in remoteRefs.items() if b in branches}
+            localRefs = {b: s for b, s in localRefs.items() if b in branches}
+        else:
+            refspecs = snapshot.remoteValues(remote, 'fetch')
+            prefix = 'refs/remotes/%s/' % remote
+            mapped = {}
+            for b, s in remoteRefs.items():
+                target = applyRefspecs(refspecs, 'refs/heads/' + b)
+                if target is None:
+                    continue
+                # Stored outside refs/remotes/<remote>/: cannot compare, fetch
+                mapped[target[len(prefix):] if target.startswith(prefix) else target] = s
+            remoteRefs = mapped
+        if any(localRefs.get(b) != s for b, s in remoteRefs.items()):
+            moved.append(remote)
+        elif argopts.get('fetch_prune', False) and set(localRefs) - set(remoteRefs):
+            moved.append(remote)
+    return moved
+
+
+def changedRemotes(rep, timeout=30):
+    """Remotes of the repository whose branches moved, asking every remote at once"""
+    remotes = getRemoteRepositories(rep)
+    if len(remotes) > 1:
+        with ThreadPoolExecutor(max_workers=len(remotes)) as executor:
+            outputs = executor.map(lambda r: gitExec(rep, lsRemoteCommand(r), timeout=timeout), remotes)
+            advertised = dict(zip(remotes, outputs))
+    else:
+        advertised = {r: gitExec(rep, lsRemoteCommand(r), timeout=timeout) for r in remotes}
+    return movedRemotes(rep, advertised)
+
+
+def checkTimesFile():
+    return os.path.join(expanduser('~'), '.gitcheck', 'checked.json')
+
+
+def getCheckTime(rep):
+    """time.time() of the last --ls-remote check of rep that found nothing to fetch, or None"""
+    global checkTimes
+    with checkTimes_lock:
+        if checkTimes is None:
+            checkTimes = jsonstore.loadJson(checkTimesFile())
+        return checkTimes.get(rep)
+
+
+def recordCheck(rep):
+    """Remember that the remotes of rep were checked up to date without fetching (--ls-remote)"""
+    global checkTimesChanged
+    getCheckTime(rep)
+    with checkTimes_lock:
+        checkTimes[rep] = time.time()
+        checkTimesChanged = True
+
+
+def saveCheckTimes():
+    """Atomically write the check times recorded during the run, next to the discovery index"""
+    global checkTimesChanged
+    with checkTimes_lock:
+        if checkTimesChanged and jsonstore.saveJson(checkTimesFile(), checkTimes):
+            checkTimesChanged = False
+
+
+def getFetchAge(rep):
+    """Seconds since the remotes of the repository were last fetched (FETCH_HEAD) or checked
+    unchanged by --ls-remote, or None"""
+    times = []
+    gitdir = discovery.resolveGitDir(rep)
+    if gitdir is not None:
+        try:
+            # FETCH_HEAD is per worktree: linked worktrees write it in their own gitdir
+            times.append(os.stat(os.path.join(gitdir, 'FETCH_HEAD')).st_mtime)
+        except OSError:
+            pass
+    checked = getCheckTime(rep)
+    if checked is not None:
+        times.append(checked)
+    if not times:
+        return None
+    return max(0, time.time() - max(times))
+
+
+def isFetchFresh(rep):
+    """True if the repository was fetched less than --fetch-ttl seconds ago"""
+    ttl = argopts.get('fetch_ttl')
+    if ttl is None:
+        return False
+    age = getFetchAge(rep)
+    return age is not None and age < ttl
+
+
 def updateRemote(rep):
+    """Update the remotes of a repository, return False if skipped by --fetch-ttl or --ls-remote"""
+    if isFetchFresh(rep):
+        showDebug(f"Skipping remote update for {rep}: fetched {formatAge(getFetchAge(rep))} ago")
+        return False
+
+    remotes = None
     try:
         # Convert to HTTPS if requested (for firewall bypass)
         if argopts.get('use_https', False):
@@ -306,18 +882,28 @@ def updateRemote(rep):
             if converted and not argopts.get('verbose', False):
                 with console_lock:
                     console.print(f"  [dim]Converted {len(info)} remote(s) to HTTPS[/dim]")
+
+        # Only fetch the remotes whose advertised branches moved
+        if argopts.get('ls_remote', False):
+            remotes = changedRemotes(rep)
+            if not remotes:
+                showDebug(f"Skipping remote update for {rep}: remote branches did not move")
+                recordCheck(rep)
+                return False
         
         # Use verbose mode to show what's being updated
         # Set a timeout to prevent hanging on slow/unresponsive remotes
-        result = gitExec(rep, "remote update", timeout=30)
+        result = fetchRemotes(rep, remotes=remotes)
         if argopts.get('verbose', False) and result.strip():
             # Show the output from remote update
             for line in result.split('\n'):
                 if line.strip():
                     console.print(f"  [dim]{line}[/dim]")
+        return True
     except subprocess.TimeoutExpired:
         raise Exception("Network timeout - remote server not responding")
     except Exception as e:
+        from . import https_utils
         # Check for authentication failures that indicate expired/invalid token
         if https_utils.isAuthenticationError(str(e)):
             # Token appears to be expired or invalid
@@ -331,12 +917,12 @@ def updateRemote(rep):
                         # Retry with new token - re-convert remotes with force_update=True
                         converted, info = ensureHttpsRemotes(rep, force_update=True)
                         # Retry the update
-                        result = gitExec(rep, "remote update", timeout=30)
+                        result = fetchRemotes(rep, remotes=remotes)
                         if argopts.get('verbose', False) and result.strip():
                             for line in result.split('\n'):
                                 if line.strip():
                                     console.print(f"  [dim]{line}[/dim]")
-                        return
+                        return True
         
         raise e
 
@@ -360,13 +946,12 @@ def canSafelyPull(rep, branch):
         
         # Check if pull would be a fast-forward (no merge needed)
         try:
+            ahead, behind = getAheadBehind(rep, remote, branch)
             # Check if local branch is behind remote
-            behind = getRemoteToPull(rep, remote, branch)
             if not behind:
                 continue  # Already up to date
             
             # Check if local branch has commits not on remote
-            ahead = getLocalToPush(rep, remote, branch)
             if ahead:
                 return False, f"Branch has local commits not pushed to {remote}"
             
@@ -390,7 +975,7 @@ def autoPullRepository(rep, branch):
         with console_lock:
             console.print(f"  [cyan]→ Auto-pulling {branch}...[/cyan]")
         
-        result = gitExec(rep, "pull --ff-only")
+        result = repoExec(rep, ['pull', '--ff-only'])
         
         if argopts.get('verbose', False) and result.strip():
             with console_lock:
@@ -402,6 +987,7 @@ def autoPullRepository(rep, branch):
             console.print("  [green]✓ Pulled successfully[/green]")
         return True
     except Exception as e:
+        from . import https_utils
         # Check for authentication failures
         if https_utils.isAuthenticationError(str(e)):
             if argopts.get('use_https', False):
@@ -414,7 +1000,7 @@ def autoPullRepository(rep, branch):
                         ensureHttpsRemotes(rep, force_update=True)
                         # Retry pull
                         try:
-                            result = gitExec(rep, "pull --ff-only")
+                            result = repoExec(rep, ['pull', '--ff-only'])
                             with console_lock:
                                 console.print("  [green]✓ Pulled successfully with new token[/green]")
                             return True
@@ -434,14 +1020,18 @@ def processRepository(repo_path):
         'path': repo_path,
         'success': False,
         'updated': False,
+        'fresh': False,
+        'unchanged': False,
         'pulled': False,
         'error': None
     }
     
     try:
         # Update remotes
-        updateRemote(repo_path)
-        result['updated'] = True
+        result['fresh'] = isFetchFresh(repo_path)
+        if not result['fresh']:
+            result['updated'] = updateRemote(repo_path)
+            result['unchanged'] = not result['updated']
         
         # Auto-pull if enabled
         if argopts.get('autopull', False):
@@ -460,46 +1050,273 @@ def processRepository(repo_path):
     return result
 
 
-# Get Default branch for repository
-def getDefaultBranch(rep):
-    sbranch = re.compile(r'^\* (.*)', flags=re.MULTILINE)
-    gitbranch = gitExec(rep, "branch"
-                        % locals())
+def repoHost(rep):
+    """Host of the repository main remote (origin, or the first one)"""
+    snapshot = getSnapshot(rep)
+    # Read from .git/config by RefReader, git only runs for unsupported layouts
+    urls = {remote: snapshot.remoteValues(remote, 'url') for remote in snapshot.remotes()}
+    urls = {remote: values[0] for remote, values in urls.items() if values}
+    if not urls:
+        return scheduler.LOCAL_HOST
+    return scheduler.remoteHost(urls.get('origin') or urls[sorted(urls)[0]])
+
+
+def newHostScheduler():
+    """Scheduler spreading remote updates across hosts (--jobs, --per-host)"""
+    return scheduler.HostScheduler(
+        max_workers=argopts.get('jobs', 4),
+        per_host=argopts.get('per_host'),
+        retryable=lambda result: not result['success'] and scheduler.isRetryableError(result['error']),
+        timed_out=lambda result: not result['success'] and scheduler.isTimeoutError(result['error']),
+        unreachable=unreachableResult,
+    )
+
+
+def unreachableResult(rep, host):
+    """processRepository result of a repository skipped because its host keeps timing out"""
+    return {
+        'path': rep,
+        'success': False,
+        'updated': False,
+        'fresh': False,
+        'unchanged': False,
+        'pulled': False,
+        'error': f"Skipped - {host} timed out repeatedly",
+    }
+
+
+def printUpdateResult(result):
+    """Print the outcome of processRepository for the parallel modes"""
+    with console_lock:
+        if result['success']:
+            status = "✓ Updated"
+            if result.get('fresh'):
+                status = f"✓ Fresh (fetched {formatAge(getFetchAge(result['path']))} ago)"
+            elif result.get('unchanged'):
+                status = "✓ Unchanged"
+            if result['pulled']:
+                status += " + Pulled"
+            console.print(f"[green]{result['path']}[/green] - {status}")
+        else:
+            console.print(f"[yellow]{result['path']}[/yellow] - Failed: {result['error']}")
+
+
+def newAsyncExecutor():
+    """Create the asyncio git engine (from a running event loop)"""
+    from .async_exec import AsyncGitExecutor
+    return AsyncGitExecutor(
+        network_limit=argopts.get('jobs', 4),
+        local_limit=argopts.get('local_jobs', 32),
+        prefix=getGitContext().prefix,
+        env=getGitContext().env,
+        failure_func=gitFailure,
+        debug=showDebug if argopts.get('debugmod', False) else None,
+        record=profiler.recordGit if profiler.enabled else None,
+    )
+
+
+async def prefetchSnapshot(executor, rep, branches=(), verbose=False):
+    """Fill the repository snapshot, running the needed git queries concurrently"""
+    snapshot = getSnapshot(rep)
+    queries = snapshot.pendingQueries(branches, verbose)
+    while queries:
+        await executor.prefetch(snapshot, queries)
+        queries = snapshot.pendingQueries(branches, verbose)
+
+
+async def checkRepositoryAsync(rep, executor):
+    """Coroutine version of bufferedCheckRepository on the asyncio engine"""
+    await prefetchSnapshot(executor, rep)
+    ignoreBranch = argopts.get('ignoreBranch', r'^$')
+    branches = [b for b in selectBranches(rep) if not re.match(ignoreBranch, b)]
+    await prefetchSnapshot(executor, rep, branches, argopts.get('verbose', False))
+    # Every answer is cached now, rendering does not block on git
+    return bufferedCheckRepository(rep)
+
+
+async def checkRepositoriesAsync(repositories):
+    """Run the local status phase on the asyncio engine, output in sorted order"""
+    import asyncio
+    executor = newAsyncExecutor()
+    tasks = [asyncio.ensure_future(checkRepositoryAsync(r, executor)) for r in repositories]
+    actionNeeded = False
+    try:
+        for task in tasks:
+            repoActionNeeded, text, report = await task
+            if text:
+                with console_lock:
+                    console.file.write(text)
+                    console.file.flush()
+            htmlReport.extend(report)
+            if repoActionNeeded:
+                actionNeeded = True
+    finally:
+        for task in tasks:
+            task.cancel()
+    return actionNeeded
+
+
+async def autoPullRepositoryAsync(rep, branch, executor):
+    """Coroutine version of autoPullRepository on the asyncio engine"""
+    await prefetchSnapshot(executor, rep, [branch])
+    can_pull, reason = canSafelyPull(rep, branch)
+    
+    if not can_pull:
+        showDebug(f"Skipping auto-pull for {rep}: {reason}")
+        return False
+    
+    try:
+        with console_lock:
+            console.print(f"  [cyan]→ Auto-pulling {branch}...[/cyan]")
+        
+        result = await executor.run(rep, ['pull', '--ff-only'], network=True)
+        
+        if argopts.get('verbose', False) and result.strip():
+            with console_lock:
+                for line in result.split('\n'):
+                    if line.strip():
+                        console.print(f"    [dim]{line}[/dim]")
+        
+        with console_lock:
+            console.print("  [green]✓ Pulled successfully[/green]")
+        return True
+    except Exception as e:
+        with console_lock:
+            console.print(f"  [yellow]⚠ Auto-pull failed: {str(e)}[/yellow]")
+        return False
+    finally:
+        getSnapshot(rep).invalidate()
+
 
-    branch = ""
-    m = sbranch.search(gitbranch)
-    if m:
-        branch = m.group(1)
+async def processRepositoryAsync(repo_path, executor):
+    """Coroutine version of processRepository on the asyncio engine"""
+    import asyncio
+    if argopts.get('use_https', False):
+        # HTTPS conversion and token prompts stay on the synchronous path
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, processRepository, repo_path)
 
+    result = {
+        'path': repo_path,
+        'success': False,
+        'updated': False,
+        'fresh': False,
+        'unchanged': False,
+        'pulled': False,
+        'error': None
+    }
+    
+    try:
+        # Update remotes
+        commands = []
+        if isFetchFresh(repo_path):
+            result['fresh'] = True
+        else:
+            await prefetchSnapshot(executor, repo_path)
+            remotes = None
+            if argopts.get('ls_remote', False):
+                remotes = await changedRemotesAsync(repo_path, executor)
+                result['unchanged'] = not remotes
+                if result['unchanged']:
+                    recordCheck(repo_path)
+            if not result['unchanged']:
+                commands = fetchCommands(repo_path, remotes)
+        try:
+            if argopts.get('fetch_jobs', 1) > 1:
+                outputs = await asyncio.gather(
+                    *(executor.run(repo_path, cmd, timeout=30, network=True) for cmd in commands)
+                )
+            else:
+                outputs = [await executor.run(repo_path, cmd, timeout=30, network=True) for cmd in commands]
+            output = ''.join(outputs)
+        finally:
+            getSnapshot(repo_path).invalidate()
+        if argopts.get('verbose', False) and output.strip():
+            with console_lock:
+                for line in output.split('\n'):
+                    if line.strip():
+                        console.print(f"  [dim]{line}[/dim]")
+        result['updated'] = bool(commands)
+        
+        # Auto-pull if enabled
+        if argopts.get('autopull', False):
+            await prefetchSnapshot(executor, repo_path)
+            for branch in getDefaultBranch(repo_path):
+                if branch:
+                    if await autoPullRepositoryAsync(repo_path, branch, executor):
+                        result['pulled'] = True
+        
+        result['success'] = True
+    except subprocess.TimeoutExpired:
+        result['error'] = "Timeout (30s) - remote not responding"
+    except Exception as e:
+        result['error'] = str(e)
+    
+    return result
+
+
+async def changedRemotesAsync(rep, executor):
+    """Coroutine version of changedRemotes on the asyncio engine"""
+    import asyncio
+    snapshot = getSnapshot(rep)
+    if snapshot.reader() is None:
+        await executor.prefetch(snapshot, [snapshot.remoteRefsCommand()])
+    remotes = getRemoteRepositories(rep)
+    outputs = await asyncio.gather(
+        *(executor.run(rep, lsRemoteCommand(r), timeout=30, network=True) for r in remotes)
+    )
+    return movedRemotes(rep, dict(zip(remotes, outputs)))
+
+
+async def updateRepositoriesAsync(repositories):
+    """Run the remote update phase on the asyncio engine"""
+    import asyncio
+    executor = newAsyncExecutor()
+    # repoHost only runs git where the refs cannot be read directly
+    queries = [('remote',), ('config', '--local', '--list')]
+    await asyncio.gather(*(
+        executor.prefetch(getSnapshot(r), queries) for r in repositories if getSnapshot(r).reader() is None
+    ))
+    jobs = [(repoHost(r), r) for r in repositories]
+    await newHostScheduler().runAsync(
+        jobs,
+        lambda r: processRepositoryAsync(r, executor),
+        lambda r, result: printUpdateResult(result),
+    )
+
+
+# Get Default branch for repository
+def getDefaultBranch(rep):
+    branch, _ = getSnapshot(rep).branches()
     return {branch}
 
 
 # Get all branches for repository
 def getAllBranches(rep):
-    gitbranch = gitExec(rep, "branch"
-                        % locals())
+    _, branches = getSnapshot(rep).branches()
+    return list(branches)
 
-    branch = gitbranch.splitlines()
 
-    return [b[2:] for b in branch]
+def getRemoteRepositories(rep):
+    return getSnapshot(rep).remotes()
 
 
-def getRemoteRepositories(rep):
-    result = gitExec(rep, "remote"
-                     % locals())
+class GitContext:
+    """Environment and argv prefix shared by every git command of a run"""
 
-    remotes = [x for x in result.split('\n') if x]
-    return remotes
+    __slots__ = ('env', 'prefix', 'sshWrapper')
 
+    def __init__(self, env, prefix, sshWrapper=None):
+        self.env = env
+        self.prefix = prefix
+        self.sshWrapper = sshWrapper
 
-def gitExec(path, cmd, timeout=None):
-    commandToExecute = "git -C \"%s\" %s" % (path, cmd)
-    cmdargs = shlex.split(commandToExecute)
-    showDebug("EXECUTE GIT COMMAND '%s'" % cmdargs)
-    
-    # Prepare environment with SSH key if provided
+
+def buildGitContext():
+    """Resolve the git environment and SSH wrapper once, from argopts"""
     env = os.environ.copy()
     ssh_key = argopts.get('ssh_key')
+    sshWrapper = None
     
     # Debug: Show SSH key configuration
     env_ssh_key = os.environ.get('GITCHECK_SSH_KEY')
@@ -527,6 +1344,7 @@ def gitExec(path, cmd, timeout=None):
         
         if plink_exe:
             env['GIT_SSH'] = plink_exe
+            sshWrapper = plink_exe
             showDebug(f"Using Pageant with plink: {plink_exe}")
             console.print(f"[dim]Using SSH via: {plink_exe}[/dim]") if argopts.get('debugmod', False) else None
         else:
@@ -537,41 +1355,159 @@ def gitExec(path, cmd, timeout=None):
     elif ssh_key and os.path.exists(ssh_key):
         # Use GIT_SSH_COMMAND for OpenSSH keys
         env['GIT_SSH_COMMAND'] = f'ssh -i "{ssh_key}" -o IdentitiesOnly=yes'
+        sshWrapper = env['GIT_SSH_COMMAND']
         showDebug(f"Using SSH key: {ssh_key}")
+    return GitContext(env, ['git'], sshWrapper)
+
+
+def getGitContext():
+    """Get the GitContext of the run, building it on first use"""
+    global gitContext
+    if gitContext is None:
+        gitContext = buildGitContext()
+    return gitContext
+
+
+def gitFailure(cmdargs, errors):
+    """Build the exception raised for a failed git command"""
+    error_msg = errors.decode('utf-8') if errors else 'Unknown error'
+    showDebug(f'Git command failed: {" ".join(cmdargs)}')
+    showDebug(f'Error output: {error_msg}')
+    
+    # Provide helpful error messages for common issues
+    if 'timed out' in error_msg.lower() or 'timeout' in error_msg.lower():
+        return Exception("Network timeout - check your connection or remote server status")
+    elif 'could not resolve host' in error_msg.lower():
+        return Exception("DNS resolution failed - check your network connection")
+    elif 'permission denied' in error_msg.lower():
+        return Exception("Authentication failed - check SSH key or credentials")
+    else:
+        return Exception(error_msg)
+
+
+def gitExec(path, cmd, timeout=None):
+    """Run git with the argument list cmd in the repository path"""
+    context = getGitContext()
+    cmdargs = context.prefix + ['-C', path] + list(cmd)
+    if argopts.get('debugmod', False):
+        showDebug("EXECUTE GIT COMMAND '%s'" % cmdargs)
     
-    p = subprocess.Popen(cmdargs, stdout=PIPE, stderr=PIPE, env=env)
+    start = time.perf_counter()
+    p = subprocess.Popen(cmdargs, stdout=PIPE, stderr=PIPE, env=context.env)
     try:
         output, errors = p.communicate(timeout=timeout)
     except subprocess.TimeoutExpired:
         p.kill()
         p.communicate()  # Clean up
         raise subprocess.TimeoutExpired(cmdargs, timeout)
+    finally:
+        if profiler.enabled:
+            profiler.recordGit(path, cmd, start, time.perf_counter() - start)
     
     if p.returncode:
-        error_msg = errors.decode('utf-8') if errors else 'Unknown error'
-        showDebug(f'Git command failed: {commandToExecute}')
-        showDebug(f'Error output: {error_msg}')
-        
-        # Provide helpful error messages for common issues
-        if 'timed out' in error_msg.lower() or 'timeout' in error_msg.lower():
-            raise Exception("Network timeout - check your connection or remote server status")
-        elif 'could not resolve host' in error_msg.lower():
-            raise Exception("DNS resolution failed - check your network connection")
-        elif 'permission denied' in error_msg.lower():
-            raise Exception("Authentication failed - check SSH key or credentials")
-        else:
-            raise Exception(error_msg)
+        raise gitFailure(cmdargs, errors)
     return output.decode('utf-8')
 
 
 # Check all git repositories
+def updateRepositories(repo):
+    """Run the remote update phase, then save the --ls-remote check times"""
+    try:
+        runRemoteUpdates(repo)
+    finally:
+        saveCheckTimes()
+
+
+def runRemoteUpdates(repo):
+    """Run the remote update phase: asyncio engine, parallel or sequential"""
+    max_workers = argopts.get('jobs', 4)  # Default to 4 parallel jobs
+    
+    if argopts.get('async', False):
+        import asyncio
+        try:
+            asyncio.run(updateRepositoriesAsync(repo))
+        except KeyboardInterrupt:
+            console.print("\n[yellow]⚠ Interrupted by user - stopping parallel processing...[/yellow]")
+            raise
+    elif argopts.get('parallel', False) and len(repo) > 1:
+        # Parallel processing with progress bar
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+        try:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                console=console
+            ) as progress:
+                task = progress.add_task(f"[cyan]Processing {len(repo)} repositories...", total=len(repo))
+                
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    hosts = list(executor.map(repoHost, repo))
+                
+                def onResult(r, result):
+                    progress.update(task, advance=1)
+                    printUpdateResult(result)
+                
+                newHostScheduler().run(list(zip(hosts, repo)), processRepository, onResult)
+        except KeyboardInterrupt:
+            console.print("\n[yellow]⚠ Interrupted by user - stopping parallel processing...[/yellow]")
+            raise
+    else:
+        # Sequential processing (original behavior)
+        for r in repo:
+            console.print(f"[cyan]Updating {r} remotes...[/cyan]")
+            try:
+                if isFetchFresh(r):
+                    console.print(f"  [green]✓ Fresh (fetched {formatAge(getFetchAge(r))} ago)[/green]")
+                elif updateRemote(r):
+                    console.print("  [green]✓ Updated[/green]")
+                else:
+                    console.print("  [green]✓ Unchanged[/green]")
+                
+                # Auto-pull if enabled
+                if argopts.get('autopull', False):
+                    # Get the current branch for this repo
+                    branch_set = getDefaultBranch(r)
+                    for branch in branch_set:
+                        if branch:  # Skip if no branch detected
+                            autoPullRepository(r, branch)
+            except KeyboardInterrupt:
+                console.print("\n[yellow]⚠ Interrupted by user[/yellow]")
+                raise
+            except Exception as e:
+                console.print(f"[yellow]Warning: Failed to update remotes for {r}[/yellow]")
+                if argopts.get('debugmod', False):
+                    console.print(f"[dim]Error: {str(e)}[/dim]")
+                continue
+
+
 def gitcheck():
     showDebug("Global Vars: %s" % argopts)
 
-    repo = searchRepositories()
+    resetSnapshots()
+    cached = None
+    if argopts.get('cached', False):
+        with profiler.phase('daemon'):
+            cached = cachedStatuses()
+    if cached is None:
+        with profiler.phase('discovery'):
+            repo = searchRepositories()
+    else:
+        repo = sorted({s.path for s in cached})
     actionNeeded = False
 
-    if argopts.get('checkremote', False):
+    # Each run starts a new report, written to result.html as it goes for the email
+    reportPath = os.path.abspath(argopts.get('searchDir', [os.getcwd()])[-1])
+    if argopts.get('email', False):
+        reportDir = os.path.join(expanduser('~'), '.gitcheck')
+        os.makedirs(reportDir, exist_ok=True)
+        htmlReport.start(reportPath, os.path.join(reportDir, 'result.html'))
+    else:
+        htmlReport.start(reportPath)
+
+    # With --cached, the daemon updates the remotes
+    if argopts.get('checkremote', False) and cached is None:
         # Validate token first if using HTTPS mode
         if argopts.get('use_https', False) and argopts.get('validate_token', False):
             from . import validate_token
@@ -592,6 +1528,9 @@ def gitcheck():
         # Only prompt for token if use_https is enabled AND token is missing or empty
         # Token will be re-prompted automatically if authentication fails during operations
         if argopts.get('use_https', False):
+            from . import https_utils
+            from rich.prompt import Confirm
+
             gitlab_token = os.environ.get('GITLAB_TOKEN', '').strip()
             if gitlab_token == '':  # Token is missing or empty
                 # Prompt for token now, before any parallel processing
@@ -618,7 +1557,7 @@ def gitcheck():
                         console.print(f"  [dim]Converted {len(info)} remote(s) to HTTPS[/dim]")
                     
                     # Try a quick remote update
-                    gitExec(test_repo, "remote update", timeout=15)
+                    fetchRemotes(test_repo, timeout=15)
                     console.print("[green]✓ Token verified successfully[/green]")
                 except Exception as e:
                     error_str = str(e)
@@ -643,7 +1582,7 @@ def gitcheck():
                             # Test the new token
                             try:
                                 converted, info = ensureHttpsRemotes(test_repo, force_update=True)
-                                gitExec(test_repo, "remote update", timeout=15)
+                                fetchRemotes(test_repo, timeout=15)
                                 console.print("[green]✓ New token verified successfully[/green]")
                             except Exception as retry_error:
                                 retry_str = str(retry_error)
@@ -665,87 +1604,32 @@ def gitcheck():
                         console.print(f"[yellow]Warning for {test_repo}: {error_str}[/yellow]")
                         console.print("[cyan]Continuing with other repositories...[/cyan]")
         
-        max_workers = argopts.get('jobs', 4)  # Default to 4 parallel jobs
-        
-        if argopts.get('parallel', False) and len(repo) > 1:
-            # Parallel processing with progress bar
-            try:
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    BarColumn(),
-                    TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                    console=console
-                ) as progress:
-                    task = progress.add_task(f"[cyan]Processing {len(repo)} repositories...", total=len(repo))
-                    
-                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                        future_to_repo = {executor.submit(processRepository, r): r for r in repo}
-                        
-                        for future in as_completed(future_to_repo):
-                            r = future_to_repo[future]
-                            try:
-                                result = future.result()
-                                progress.update(task, advance=1)
-                                
-                                with console_lock:
-                                    if result['success']:
-                                        status = "✓ Updated"
-                                        if result['pulled']:
-                                            status += " + Pulled"
-                                        console.print(f"[green]{result['path']}[/green] - {status}")
-                                    else:
-                                        console.print(f"[yellow]{result['path']}[/yellow] - Failed: {result['error']}")
-                            except Exception as e:
-                                progress.update(task, advance=1)
-                                with console_lock:
-                                    console.print(f"[red]{r}[/red] - Error: {str(e)}")
-            except KeyboardInterrupt:
-                console.print("\n[yellow]⚠ Interrupted by user - stopping parallel processing...[/yellow]")
-                raise
-        else:
-            # Sequential processing (original behavior)
-            for r in repo:
-                console.print(f"[cyan]Updating {r} remotes...[/cyan]")
-                try:
-                    updateRemote(r)
-                    console.print("  [green]✓ Updated[/green]")
-                    
-                    # Auto-pull if enabled
-                    if argopts.get('autopull', False):
-                        # Get the current branch for this repo
-                        branch_set = getDefaultBranch(r)
-                        for branch in branch_set:
-                            if branch:  # Skip if no branch detected
-                                autoPullRepository(r, branch)
-                except KeyboardInterrupt:
-                    console.print("\n[yellow]⚠ Interrupted by user[/yellow]")
-                    raise
-                except Exception as e:
-                    console.print(f"[yellow]Warning: Failed to update remotes for {r}[/yellow]")
-                    if argopts.get('debugmod', False):
-                        console.print(f"[dim]Error: {str(e)}[/dim]")
-                    continue
+        with profiler.phase('fetch'):
+            updateRepositories(repo)
 
-    if argopts.get('watchInterval', 0) > 0:
+    if argopts.get('watchInterval', 0) > 0 and not argopts.get('format'):
         console.clear()
         console.print(f"[bold]{strftime('%Y-%m-%d %H:%M:%S')}[/bold]")
 
     showDebug("Processing repositories... please wait.")
-    for r in repo:
-        try:
-            if (argopts.get('checkall', False)):
-                branch = getAllBranches(r)
+    try:
+        # Rendering runs interleaved with the status stage, its 'render' spans are nested in 'status'
+        with profiler.phase('status'):
+            if cached is not None:
+                repoActionNeeded = renderStatuses(cached)
+            elif argopts.get('format'):
+                repoActionNeeded = writeRepositoryRecords(repo)
+            elif argopts.get('async', False):
+                import asyncio
+                repoActionNeeded = asyncio.run(checkRepositoriesAsync(repo))
             else:
-                branch = getDefaultBranch(r)
-            for b in branch:
-                if checkRepository(r, b):
-                    actionNeeded = True
-        except KeyboardInterrupt:
-            console.print("\n[yellow]⚠ Interrupted by user[/yellow]")
-            raise
-    html.timestamp = strftime("%Y-%m-%d %H:%M:%S")
-    html.msg += "</ul>\n<p>Report created on %s</p>\n" % html.timestamp
+                repoActionNeeded = checkRepositories(repo)
+        if repoActionNeeded:
+            actionNeeded = True
+    except KeyboardInterrupt:
+        console.print("\n[yellow]⚠ Interrupted by user[/yellow]")
+        raise
+    htmlReport.finish()
 
     if actionNeeded and argopts.get('bellOnActionNeeded', False):
         console.bell()
@@ -770,6 +1654,8 @@ def openTortoiseDiff(repo_path):
 
 def handleInteractiveMode(repositories):
     """Interactive mode to review and commit/discard changes"""
+    from rich.prompt import Prompt, Confirm
+
     console.print("\n[bold cyan]═══ Interactive Mode ═══[/bold cyan]\n")
     
     repos_with_changes = []
@@ -790,7 +1676,7 @@ def handleInteractiveMode(repositories):
         
         # Show changed files
         for status, filename in changes[:5]:  # Show first 5
-            console.print(f"    [{colortheme['commitstate']}]{status}[/] {filename}")
+            console.print(f"    [{getColortheme()['commitstate']}]{status}[/] {filename}")
         if len(changes) > 5:
             console.print(f"    [dim]... and {len(changes) - 5} more[/dim]")
         
@@ -812,14 +1698,15 @@ def handleInteractiveMode(repositories):
             console.print("[cyan]Opening TortoiseGit...[/cyan]")
             if openTortoiseDiff(repo):
                 if Confirm.ask("Press Enter when done with TortoiseGit commit", default=True):
-                    # Check if changes still exist
+                    # Check if changes still exist (the commit happened outside gitcheck)
+                    getSnapshot(repo).invalidate()
                     remaining = getLocalFilesChange(repo)
                     if len(remaining) == 0:
                         console.print("[green]✓ Changes committed successfully![/green]")
                         # Ask about push
                         if Confirm.ask("  Push to remote?", default=True):
                             try:
-                                gitExec(repo, "push")
+                                repoExec(repo, ['push'])
                                 console.print("[green]✓ Pushed to remote![/green]")
                             except Exception as e:
                                 console.print(f"[red]✗ Push failed: {str(e)}[/red]")
@@ -832,7 +1719,7 @@ def handleInteractiveMode(repositories):
             # Discard changes
             if Confirm.ask("[red]⚠ Are you SURE you want to discard all changes? This cannot be undone!", default=False):
                 try:
-                    gitExec(repo, "reset --hard")
+                    repoExec(repo, ['reset', '--hard'])
                     console.print("[green]✓ Changes discarded[/green]")
                 except Exception as e:
                     console.print(f"[red]✗ Failed to discard: {str(e)}[/red]")
@@ -843,13 +1730,13 @@ def handleInteractiveMode(repositories):
             commit_msg = Prompt.ask("Commit message")
             if commit_msg:
                 try:
-                    gitExec(repo, "add -A")
-                    gitExec(repo, f'commit -m "{commit_msg}"')
+                    repoExec(repo, ['add', '-A'])
+                    repoExec(repo, ['commit', '-m', commit_msg])
                     console.print("[green]✓ Changes committed![/green]")
                     # Ask about push
                     if Confirm.ask("  Push to remote?", default=True):
                         try:
-                            gitExec(repo, "push")
+                            repoExec(repo, ['push'])
                             console.print("[green]✓ Pushed to remote![/green]")
                         except Exception as e:
                             console.print(f"[red]✗ Push failed: {str(e)}[/red]")
@@ -861,7 +1748,11 @@ def handleInteractiveMode(repositories):
     console.print("\n[bold cyan]═══ Interactive Mode Complete ═══[/bold cyan]\n")
 
 
-def sendReport(content):
+def sendReport(report):
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     userPath = expanduser('~')
     filepath = os.path.join(userPath, '.gitcheck')
     filename = os.path.join(filepath, 'mail.properties')
@@ -869,19 +1760,16 @@ def sendReport(content):
 
     # Create message container - the correct MIME type is multipart/alternative.
     msg = MIMEMultipart('alternative')
-    msg['Subject'] = "Gitcheck Report (%s)" % (html.path)
+    msg['Subject'] = "Gitcheck Report (%s)" % (report.path)
     msg['From'] = config['from']
     msg['To'] = config['to']
 
     # Create the body of the message (a plain-text and an HTML version).
-    text = "Gitcheck report for %s created on %s\n\n This file can be seen in html only." % (html.path, html.timestamp)
-    htmlcontent = "<html>\n<head>\n<h1>Gitcheck Report</h1>\n<h2>%s</h2>\n</head>\n<body>\n<p>%s</p>\n</body>\n</html>" % (
-        html.path, content
-    )
-    # Write html file to disk
-    with open(os.path.join(filepath, 'result.html'), 'w') as f:
-        f.write(htmlcontent)
-    console.print(f"[green]File saved under {os.path.join(filepath, 'result.html')}[/green]")
+    text = "Gitcheck report for %s created on %s\n\n This file can be seen in html only." % (report.path, report.timestamp)
+    htmlcontent = report.document()
+    # The html file was written to disk during the run
+    if report.filename is not None:
+        console.print(f"[green]File saved under {report.filename}[/green]")
     # Record the MIME types of both parts - text/plain and text/html.
     part1 = MIMEText(text, 'plain')
     part2 = MIMEText(htmlcontent, 'html')
@@ -932,7 +1820,7 @@ def sendReport(content):
         s.sendmail(config['from'], config['to'], msg.as_string())
         s.quit()
         console.print("[green]Email sent successfully![/green]")
-    except SMTPException as e:
+    except smtplib.SMTPException as e:
         console.print(f"[red]Error sending email: {str(e)}[/red]")
         console.print("[yellow]Tip: Try running with --debug flag for more details[/yellow]")
     except Exception as e:
@@ -977,15 +1865,33 @@ def usage():
     console.print("  [green]-r, --remote[/green]                         force remote update (slow)")
     console.print("  [green]-p, --auto-pull[/green]                      Auto-pull when safe (no conflicts, no local changes)")
     console.print("  [green]-j, --parallel[/green]                       Use parallel processing for remote updates (faster)")
-    console.print("  [green]--jobs=<n>[/green]                           Number of parallel jobs (default: 4)")
+    console.print("  [green]--jobs=<n>[/green]                           Number of parallel jobs for status checks and remote updates (default: 4)")
+    console.print("  [green]--ls-remote[/green]                          Ask the remotes with git ls-remote first, only fetch those whose branches moved")
+    console.print("  [green]--fetch-ttl=<sec>[/green]                    Skip remote updates of repositories fetched less than <sec> seconds ago, show fetch age")
+    console.print("  [green]--per-host=<n>[/green]                       Update at most <n> repositories of the same remote host at once (backs off on HTTP 429/timeouts)")
+    console.print("  [green]--fetch-jobs=<n>[/green]                     Fetch the remotes (and submodules) of each repository <n> at a time")
+    console.print("  [green]--fetch-submodules[/green]                   Also fetch submodules when updating remotes (--recurse-submodules)")
+    console.print("  [green]--async[/green]                              Run git commands on the asyncio engine (--jobs network, --local-jobs local commands)")
+    console.print("  [green]--local-jobs=<n>[/green]                     Number of local git commands in flight with --async (default: 32)")
+    console.print("  [green]--processes=<n>[/green]                      Compute the local status of many repositories in <n> worker processes (one repository per worker at a time)")
+    console.print("  [green]--max-commits=<n>[/green]                    In verbose mode, list at most <n> commits to push/pull per remote")
+    console.print("  [green]--format=<fmt>[/green]                       Stream one record per repository branch as 'json', 'jsonl' or 'csv' on stdout")
+    console.print("  [green]--fetch=<mode>[/green]                       Remote update mode: 'update' (git remote update, default) or 'targeted' (only the checked branches)")
+    console.print("  [green]--no-tags[/green]                            Do not fetch tags when updating remotes")
+    console.print("  [green]--prune[/green]                              Prune deleted remote branches when updating remotes")
+    console.print("  [green]--fetch-filter=<spec>[/green]                Partial clone filter (e.g. blob:none) for promisor remotes with --fetch=targeted")
     console.print("  [green]--use-https[/green]                          Convert git:// and SSH URLs to HTTPS (firewall bypass)")
     console.print("  [green]--validate-token[/green]                     Validate GitLab token before checking repositories")
     console.print("  [green]-u, --untracked[/green]                      Show untracked files")
     console.print("  [green]-b, --bell[/green]                           bell on action needed")
     console.print("  [green]-w <sec>, --watch=<sec>[/green]              after displaying, wait <sec> and run again")
+    console.print("  [green]--events[/green]                             with --watch, only re-check repositories whose files changed (inotify or polling)")
+    console.print("  [green]--live[/green]                               with --watch, show a live table updated in place, with a last changed column")
     console.print("  [green]-i <re>, --ignore-branch=<re>[/green]        ignore branches matching the regex <re>")
     console.print("  [green]-d <dir>, --dir=<dir>[/green]                Search <dir> for repositories (can be used multiple times)")
     console.print("  [green]-m <maxdepth>, --maxdepth=<maxdepth>[/green] Limit the depth of repositories search")
+    console.print("  [green]-x <glob>, --exclude=<glob>[/green]          Skip directories matching <glob> during search (can be used multiple times)")
+    console.print("  [green]--rescan[/green]                             Ignore the discovery index (~/.gitcheck/index.json) and rescan all directories")
     console.print("  [green]-q, --quiet[/green]                          Display info only when repository needs action")
     console.print("  [green]-e, --email[/green]                          Send an email with result as html, using mail.properties parameters")
     console.print("  [green]-a, --all-branch[/green]                     Show the status of all branches")
@@ -993,22 +1899,85 @@ def usage():
     console.print("  [green]-I, --interactive[/green]                    Interactive mode: review and commit/discard changes with TortoiseGit")
     console.print("  [green]--init-email[/green]                         Initialize mail.properties file (has to be modified by user using JSON Format)")
     console.print("  [green]--ssh-key=<path>[/green]                     Path to SSH private key for git operations")
+    console.print("  [green]--prompt[/green]                             Print a compact status of the current repository for shell prompts (see gitcheck_prompt)")
+    console.print("  [green]--daemon[/green]                             Keep the status of the repositories in memory, refreshed on changes and every -w <sec> (default: 60), and serve it on a Unix socket")
+    console.print("  [green]--cached[/green]                             Ask the status to a running --daemon, check the repositories as usual if none answers")
+    console.print("  [green]--socket=<path>[/green]                      Unix socket of --daemon and --cached (default: ~/.gitcheck/daemon.sock)")
+    console.print("  [green]--profile[/green]                            At exit, report phase times, git process counts and latencies, slowest repositories")
+    console.print("  [green]--profile-trace=<file>[/green]               Like --profile, also write the spans as a Chrome trace JSON file")
     console.print("\n[bold yellow]== Environment Variables ==[/bold yellow]")
     console.print("  [green]GITCHECK_SMTP_PASSWORD[/green]               SMTP password for email authentication (if smtp_username is set)")
     console.print("  [green]GITCHECK_SSH_KEY[/green]                     Path to SSH private key (alternative to --ssh-key option)")
     console.print("  [green]GITLAB_TOKEN[/green]                         GitLab/private repo personal access token (for HTTPS with --use-https)")
 
 
+def printPrompt():
+    """Prompt mode (--prompt): compact status of the repository enclosing the (last -d) directory"""
+    from . import shellprompt
+
+    path = argopts.get('searchDir', [os.getcwd()])[-1]
+    text = shellprompt.promptStatus(path, untracked=argopts.get('checkUntracked', False))
+    if text:
+        print(text)
+
+
+def reportProfile():
+    """Print the --profile summary and write the trace file if asked"""
+    profiler.report(console)
+    trace = argopts.get('profile_trace')
+    if trace:
+        try:
+            profiler.writeTrace(trace)
+            console.print(f"[dim]Trace written to {trace}[/dim]")
+        except OSError as e:
+            console.print(f"[red]Cannot write trace {trace}: {e}[/red]")
+
+
+def checkLoop():
+    """Run gitcheck once, again and again in watch mode, or serve the statuses in daemon mode"""
+    if argopts.get('daemon', False):
+        serveRepositories()
+        return
+
+    if (argopts.get('watch_events', False) or argopts.get('live', False)) and argopts.get('watchInterval', 0) > 0:
+        watchRepositories()
+        return
+
+    while True:
+        try:
+            gitcheck()
+
+            if argopts.get('email', False):
+                with profiler.phase('email'):
+                    sendReport(htmlReport)
+
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception as e:
+            console.print(f"[red]Unexpected error: {str(e)}[/red]")
+
+        if argopts.get('watchInterval', 0) > 0:
+            time.sleep(argopts.get('watchInterval', 0))
+        else:
+            break
+
+
 def main():
+    global gitContext
     # Rich console handles colors automatically on all platforms
     try:
         opts, args = getopt.getopt(
             sys.argv[1:],
-            "vhrubpjw:i:d:m:qeal:I",
+            "vhrubpjw:i:d:m:x:qeal:I",
             [
                 "verbose", "debug", "help", "remote", "untracked", "bell", "auto-pull", "parallel", "watch=", "ignore-branch=",
                 "dir=", "maxdepth=", "quiet", "email", "init-email", "all-branch", "localignore=", "interactive",
-                "ssh-key=", "jobs=", "use-https", "validate-token"
+                "ssh-key=", "jobs=", "use-https", "validate-token", "exclude=",
+                "rescan", "async", "local-jobs=", "fetch=", "no-tags", "prune", "fetch-filter=",
+                "fetch-jobs=", "fetch-submodules", "per-host=",
+                "fetch-ttl=", "ls-remote", "events", "live", "format=",
+                "max-commits=", "processes=", "profile", "profile-trace=",
+                "daemon", "cached", "socket=", "prompt"
             ]
         )
     except getopt.GetoptError as error:
@@ -1041,13 +2010,105 @@ def main():
             argopts['parallel'] = True
         elif opt in ["--jobs"]:
             try:
-                argopts['jobs'] = min(int(arg), 10)  # Limit to max 10 jobs
+                argopts['jobs'] = int(arg)
                 if argopts['jobs'] < 1:
                     console.print("[red]Number of jobs must be at least 1[/red]")
                     sys.exit(2)
             except ValueError:
                 console.print(f"[red]option {opt} requires int value[/red]")
                 sys.exit(2)
+        elif opt in ["--fetch-jobs"]:
+            try:
+                argopts['fetch_jobs'] = int(arg)
+                if argopts['fetch_jobs'] < 1:
+                    console.print("[red]Number of jobs must be at least 1[/red]")
+                    sys.exit(2)
+            except ValueError:
+                console.print(f"[red]option {opt} requires int value[/red]")
+                sys.exit(2)
+        elif opt in ["--live"]:
+            argopts['live'] = True
+        elif opt in ["--events"]:
+            argopts['watch_events'] = True
+        elif opt in ["--ls-remote"]:
+            argopts['ls_remote'] = True
+        elif opt in ["--fetch-ttl"]:
+            try:
+                argopts['fetch_ttl'] = float(arg)
+            except ValueError:
+                console.print(f"[red]option {opt} requires numeric value[/red]")
+                sys.exit(2)
+        elif opt in ["--per-host"]:
+            try:
+                argopts['per_host'] = int(arg)
+                if argopts['per_host'] < 1:
+                    console.print("[red]Number of jobs must be at least 1[/red]")
+                    sys.exit(2)
+            except ValueError:
+                console.print(f"[red]option {opt} requires int value[/red]")
+                sys.exit(2)
+        elif opt in ["--fetch-submodules"]:
+            argopts['fetch_submodules'] = True
+        elif opt in ["--async"]:
+            argopts['async'] = True
+        elif opt in ["--local-jobs"]:
+            try:
+                argopts['local_jobs'] = int(arg)
+                if argopts['local_jobs'] < 1:
+                    console.print("[red]Number of jobs must be at least 1[/red]")
+                    sys.exit(2)
+            except ValueError:
+                console.print(f"[red]option {opt} requires int value[/red]")
+                sys.exit(2)
+        elif opt in ["--processes"]:
+            try:
+                argopts['processes'] = int(arg)
+                if argopts['processes'] < 1:
+                    console.print("[red]Number of processes must be at least 1[/red]")
+                    sys.exit(2)
+            except ValueError:
+                console.print(f"[red]option {opt} requires int value[/red]")
+                sys.exit(2)
+        elif opt in ["--max-commits"]:
+            try:
+                argopts['max_commits'] = int(arg)
+                if argopts['max_commits'] < 0:
+                    console.print("[red]Number of commits must be at least 0[/red]")
+                    sys.exit(2)
+            except ValueError:
+                console.print(f"[red]option {opt} requires int value[/red]")
+                sys.exit(2)
+        elif opt in ["--prompt"]:
+            argopts['prompt'] = True
+        elif opt in ["--daemon"]:
+            argopts['daemon'] = True
+        elif opt in ["--cached"]:
+            argopts['cached'] = True
+        elif opt in ["--socket"]:
+            argopts['socket'] = os.path.abspath(expanduser(arg))
+        elif opt in ["--profile"]:
+            profiler.enable()
+        elif opt in ["--profile-trace"]:
+            profiler.enable()
+            argopts['profile_trace'] = arg
+        elif opt in ["--format"]:
+            if arg not in formats.FORMATS:
+                console.print(f"[red]option {opt} must be one of {', '.join(formats.FORMATS)}[/red]")
+                sys.exit(2)
+            argopts['format'] = arg
+            # Keep stdout for the records, messages go to stderr
+            console.file = sys.stderr
+        elif opt in ["--fetch"]:
+            if arg not in ['update', 'targeted']:
+                console.print(f"[red]option {opt} must be 'update' or 'targeted'[/red]")
+                sys.exit(2)
+            argopts['fetch_mode'] = arg
+        elif opt in ["--no-tags"]:
+            argopts['fetch_no_tags'] = True
+        elif opt in ["--prune"]:
+            argopts['fetch_prune'] = True
+        elif opt in ["--fetch-filter"]:
+            argopts['fetch_filter'] = arg
         elif opt in ["-u", "--untracked"]:
             argopts['checkUntracked'] = True
         elif opt in ["-b", "--bell"]:
@@ -1061,7 +2122,11 @@ def main():
         elif opt in ["-i", "--ignore-branch"]:
             argopts['ignoreBranch'] = arg
         elif opt in ["-l", "--localignore"]:
-            argopts['ignoreLocal'] = arg
+            try:
+                argopts['ignoreLocal'] = re.compile(arg)
+            except re.error as e:
+                console.print(f"[red]option {opt} requires a valid regex: {e}[/red]")
+                sys.exit(2)
         elif opt in ["-d", "--dir"]:
             dirs = argopts.get('searchDir', [])
             if (dirs == []):
@@ -1073,6 +2138,10 @@ def main():
             except ValueError:
                 console.print(f"[red]option {opt} requires int value[/red]")
                 sys.exit(2)
+        elif opt in ["-x", "--exclude"]:
+            argopts.setdefault('exclude', []).append(arg)
+        elif opt in ["--rescan"]:
+            argopts['rescan'] = True
         elif opt in ["-q", "--quiet"]:
             argopts['quiet'] = True
         elif opt in ["-e", "--email"]:
@@ -1104,22 +2173,29 @@ def main():
 #            print "Unhandled option %s" % opt
 #            sys.exit(2)
 
-    while True:
-        try:
-            gitcheck()
+    if argopts.get('cached', False) and argopts.get('checkremote', False):
+        # The daemon updates the remotes on its own schedule
+        console.print("[red]--cached cannot be used with -r, -p or -I[/red]")
+        sys.exit(2)
 
-            if argopts.get('email', False):
-                sendReport(html.msg)
+    if (argopts.get('watch_events', False) or argopts.get('live', False)) and argopts.get('watchInterval', 0) > 0 \
+            and (argopts.get('email', False) or argopts.get('format')):
+        # The incremental watch mode only redraws the screen
+        console.print("[red]--events and --live cannot be used with -e or --format[/red]")
+        sys.exit(2)
 
-        except (KeyboardInterrupt, SystemExit):
-            raise
-        except Exception as e:
-            console.print(f"[red]Unexpected error: {str(e)}[/red]")
+    if argopts.get('prompt', False):
+        printPrompt()
+        return
+
+    gitContext = buildGitContext()
+
+    try:
+        checkLoop()
+    finally:
+        if profiler.enabled:
+            reportProfile()
 
-        if argopts.get('watchInterval', 0) > 0:
-            time.sleep(argopts.get('watchInterval', 0))
-        else:
-            break
 
 if __name__ == "__main__":
     try:
@@ -17,8 +17,6 @@ import sys
 import re
 import subprocess
 
-from rich.prompt import Prompt
-
 
 def promptForToken(console, console_lock):
     """
@@ -37,6 +35,7 @@ def promptForToken(console, console_lock):
         console.print("[cyan]Get your token at: https://git.servisys.com/-/user_settings/personal_access_tokens[/cyan]")
         console.print("[dim]Required scopes: read_repository, write_repository (for pull operations)[/dim]")
         
+        from rich.prompt import Prompt
         token_input = Prompt.ask(
             "\n[cyan]Enter your GitLab/Git personal access token (or press Enter to skip)[/cyan]",
             password=True,
@@ -68,6 +67,7 @@ def promptForNewToken(console, console_lock, reason="expired or invalid"):
         console.print("[cyan]Get your token at: https://git.servisys.com/-/user_settings/personal_access_tokens[/cyan]")
         console.print("[dim]Required scopes: read_repository, write_repository (for pull operations)[/dim]")
         
+        from rich.prompt import Prompt
         token_input = Prompt.ask(
             "\n[cyan]Enter your new GitLab/Git personal access token (or press Enter to skip)[/cyan]",
             password=False,
@@ -178,7 +178,7 @@ def convertRemoteToHttps(rep, remote_name, gitlab_token, git_exec_func, force_up
     """
     try:
         # Get current remote URL
-        result = git_exec_func(rep, f"remote get-url {remote_name}")
+        result = git_exec_func(rep, ['remote', 'get-url', remote_name])
         current_url = result.strip()
         
         if not current_url:
@@ -231,7 +231,7 @@ def convertRemoteToHttps(rep, remote_name, gitlab_token, git_exec_func, force_up
                     new_url = f'https://oauth2:{gitlab_token}@{match.group(1)}'
             
             # Update the remote URL
-            git_exec_func(rep, f"remote set-url {remote_name} {new_url}")
+            git_exec_func(rep, ['remote', 'set-url', remote_name, new_url])
             
             # Sanitize token in display message
             display_url = new_url
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Small JSON state files of gitcheck (~/.gitcheck)
+
+This module handles:
+- Loading a JSON object, empty when the file is missing or unreadable
+- Writing it atomically (temporary file and os.replace), so concurrent runs
+  and shell prompts never read a partial file
+It has no dependency, the shell prompt imports it.
+"""
+
+import json
+import os
+
+
+def loadJson(filename):
+    """
+    Load a JSON object
+
+    Args:
+        filename: File path
+
+    Returns:
+        dict: Content, empty if missing, unreadable or not an object
+    """
+    try:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def saveJson(filename, data):
+    """
+    Atomically write a JSON object, creating the directory if needed
+
+    Args:
+        filename: File path
+        data: JSON serializable dict
+
+    Returns:
+        bool: True if saved, False on error (e.g. read-only home directory)
+    """
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(tmpname, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmpname, filename)
+        return True
+    except OSError:
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+        return False
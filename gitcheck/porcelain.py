@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Parser for ``git status --porcelain=v2 --branch`` output
+
+A single porcelain v2 call gives gitcheck everything it needs about the
+working tree and the current branch:
+- Changed, unmerged and untracked files
+- Current branch name and its upstream
+- Ahead/behind counts against the upstream
+"""
+
+
+def statusCode(xy):
+    """
+    Convert a porcelain v2 XY field to the two-character ``status -s`` code
+
+    Args:
+        xy: XY field, using '.' for unmodified
+
+    Returns:
+        str: Status code as printed by ``git status -s`` (e.g. ' M')
+    """
+    return xy.replace('.', ' ')
+
+
+def parseStatus(output):
+    """
+    Parse the output of ``git status --porcelain=v2 --branch``
+
+    Args:
+        output: Decoded stdout of the git command
+
+    Returns:
+        dict: Keys 'head' (branch name or None when detached), 'oid',
+              'upstream' ('remote/branch' or None), 'ahead' and 'behind'
+              (int or None without upstream) and 'changes', a list of
+              [code, path] pairs in ``status -s`` format
+    """
+    status = {
+        'head': None,
+        'oid': None,
+        'upstream': None,
+        'ahead': None,
+        'behind': None,
+        'changes': [],
+    }
+
+    for line in output.split('\n'):
+        if not line:
+            continue
+
+        if line.startswith('# '):
+            key, _, value = line[2:].partition(' ')
+            if key == 'branch.head':
+                status['head'] = None if value == '(detached)' else value
+            elif key == 'branch.oid':
+                status['oid'] = None if value == '(initial)' else value
+            elif key == 'branch.upstream':
+                status['upstream'] = value
+            elif key == 'branch.ab':
+                ahead, behind = value.split(' ')
+                status['ahead'] = int(ahead)
+                status['behind'] = -int(behind)
+            continue
+
+        kind = line[0]
+        if kind == '1':
+            # 1 XY sub mH mI mW hH hI path
+            fields = line.split(' ', 8)
+            status['changes'].append([statusCode(fields[1]), fields[8]])
+        elif kind == '2':
+            # 2 XY sub mH mI mW hH hI Xscore path<tab>origPath
+            fields = line.split(' ', 9)
+            path, _, origpath = fields[9].partition('\t')
+            status['changes'].append([statusCode(fields[1]), f'{origpath} -> {path}'])
+        elif kind == 'u':
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            fields = line.split(' ', 10)
+            status['changes'].append([statusCode(fields[1]), fields[10]])
+        elif kind == '?':
+            status['changes'].append(['??', line[2:]])
+        elif kind == '!':
+            status['changes'].append(['!!', line[2:]])
+
+    return status
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Profiling of gitcheck runs (--profile)
+
+This module handles:
+- Timing the phases of a run (discovery, fetch, status, render, email)
+- Accounting every git process: subcommand, repository and latency
+- Summarizing per-phase wall time, process counts and p50/p95 latency per
+  git subcommand, and the slowest repositories
+- Writing the spans as a Chrome trace (chrome://tracing, Perfetto)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)]
+
+
+class Profiler:
+    """Collect phase and git process spans, thread safe"""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.phases = []    # (name, start, duration, thread id)
+        self.commands = []  # (subcommand, repository, start, duration, thread id)
+
+    def enable(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the run (nothing is recorded when disabled)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.phases.append((name, start, duration, threading.get_ident()))
+
+    def recordGit(self, path, cmd, start, duration):
+        """
+        Record one git process
+
+        Args:
+            path: Repository path
+            cmd: Git arguments (without the leading 'git')
+            start: time.perf_counter() at start
+            duration: Wall time in seconds
+        """
+        subcommand = cmd[0] if cmd else ''
+        with self.lock:
+            self.commands.append((subcommand, path, start, duration, threading.get_ident()))
+
+    def takeCommands(self):
+        """
+        Remove and return the recorded git processes, to send them from a
+        worker process to the profiler of the parent (see mergeCommands)
+
+        Returns:
+            list: Records, the thread id replaced by the process id
+        """
+        pid = os.getpid()
+        with self.lock:
+            commands, self.commands = self.commands, []
+        return [(subcommand, path, start, duration, pid) for subcommand, path, start, duration, _ in commands]
+
+    def mergeCommands(self, commands):
+        """
+        Add git processes recorded in a worker process (takeCommands)
+
+        time.perf_counter() is a system wide monotonic clock on Linux, macOS
+        and Windows, so the start times of workers line up with ours.
+        """
+        with self.lock:
+            self.commands.extend(tuple(command) for command in commands)
+
+    def summary(self, slowest=10):
+        """
+        Returns:
+            dict: 'phases' (name -> wall seconds, count), 'git' (subcommand ->
+                  count, total, p50, p95, max) and 'slowest' (list of
+                  (repository, git seconds, processes))
+        """
+        with self.lock:
+            phases = list(self.phases)
+            commands = list(self.commands)
+
+        phaseTotals = {}
+        for name, _, duration, _ in phases:
+            total, count = phaseTotals.get(name, (0.0, 0))
+            phaseTotals[name] = (total + duration, count + 1)
+
+        durations = {}
+        repos = {}
+        for subcommand, path, _, duration, _ in commands:
+            durations.setdefault(subcommand, []).append(duration)
+            total, count = repos.get(path, (0.0, 0))
+            repos[path] = (total + duration, count + 1)
+
+        git = {
+            sub: {
+                'count': len(values),
+                'total': sum(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'max': max(values),
+            }
+            for sub, values in durations.items()
+        }
+        ranked = sorted(repos.items(), key=lambda item: item[1][0], reverse=True)[:slowest]
+        return {
+            'phases': phaseTotals,
+            'git': git,
+            'slowest': [(path, total, count) for path, (total, count) in ranked],
+        }
+
+    def report(self, console):
+        """Print the summary on a rich console"""
+        summary = self.summary()
+        console.print("[bold]Profile[/bold]")
+        console.print("  [cyan]Phases[/cyan]")
+        for name, (total, count) in sorted(summary['phases'].items(), key=lambda item: -item[1][0]):
+            console.print(f"    {name:<12} {total * 1000:10.1f} ms  ({count} span{'s' if count > 1 else ''})")
+
+        total = sum(s['count'] for s in summary['git'].values())
+        console.print(f"  [cyan]Git processes[/cyan] ({total})")
+        console.print(f"    {'command':<14} {'count':>6} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for sub, s in sorted(summary['git'].items(), key=lambda item: -item[1]['total']):
+            console.print(
+                f"    {sub:<14} {s['count']:>6} {s['total'] * 1000:>10.1f} "
+                f"{s['p50'] * 1000:>8.1f} {s['p95'] * 1000:>8.1f} {s['max'] * 1000:>8.1f}"
+            )
+
+        if summary['slowest']:
+            console.print("  [cyan]Slowest repositories[/cyan] (git time)")
+            for path, seconds, count in summary['slowest']:
+                console.print(f"    {seconds * 1000:10.1f} ms  {count:>4} git  {path}")
+
+    def writeTrace(self, filename):
+        """
+        Write the spans in the Chrome trace event format
+
+        Args:
+            filename: Output JSON file
+        """
+        with self.lock:
+            phases = list(self.phases)
+            commands = list(self.commands)
+
+        pid = os.getpid()
+        events = []
+        for name, start, duration, tid in phases:
+            events.append({
+                'name': name, 'cat': 'phase', 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6,
+            })
+        for subcommand, path, start, duration, tid in commands:
+            events.append({
+                'name': 'git ' + subcommand, 'cat': 'git', 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6,
+                'args': {'repository': path},
+            })
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pure Python reader of git refs for gitcheck
+
+This module handles:
+- Resolving the git directory of a working tree, following .git files
+  (worktrees and submodules) and their shared common directory
+- Reading HEAD, loose refs and packed-refs
+- Listing the remotes defined in the repository configuration, with their
+  settings (url, fetch refspecs)
+- Mapping remote refs through fetch refspecs, like git fetch
+- Refusing layouts it does not understand (reftable, config includes,
+  detached HEAD), so callers fall back to running git
+"""
+
+import os
+import re
+
+from . import discovery
+
+
+REMOTE_SECTION = re.compile(r'^\s*\[\s*remote\s+"((?:[^"\\]|\\.)*)"\s*\]', re.IGNORECASE)
+CONFIG_ENTRY = re.compile(r'^\s*([A-Za-z][A-Za-z0-9-]*)\s*(?:=(.*))?$')
+CONFIG_ESCAPES = {'n': '\n', 't': '\t', 'b': '\b'}
+UNSUPPORTED_CONFIG = re.compile(r'^\s*(\[\s*include|refstorage\s*=)', re.IGNORECASE | re.MULTILINE)
+
+
+def configValue(raw):
+    """
+    Decode the value of a config entry: quotes, escapes and comments
+
+    Args:
+        raw: Text after the '=' of the entry (None for a bare key, true)
+
+    Returns:
+        str: Value
+    """
+    if raw is None:
+        return 'true'
+    value = []
+    quoted = False
+    escaped = False
+    for char in raw.strip():
+        if escaped:
+            value.append(CONFIG_ESCAPES.get(char, char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char in '#;' and not quoted:
+            break
+        else:
+            value.append(char)
+    return ''.join(value).rstrip()
+
+
+def matchRefPattern(pattern, ref):
+    """
+    Match a ref against one side of a refspec
+
+    Returns:
+        str: The part matched by '*' ('' without '*'), None if no match
+    """
+    if '*' not in pattern:
+        return '' if ref == pattern else None
+    prefix, _, suffix = pattern.partition('*')
+    if len(ref) < len(prefix) + len(suffix) or not ref.startswith(prefix) or not ref.endswith(suffix):
+        return None
+    return ref[len(prefix):len(ref) - len(suffix)]
+
+
+def applyRefspecs(refspecs, ref):
+    """
+    Map a remote ref through fetch refspecs, like git fetch does
+
+    Args:
+        refspecs: Values of remote.<name>.fetch, like
+                  '+refs/heads/*:refs/remotes/origin/*' or '^refs/heads/tmp'
+        ref: Remote ref, like 'refs/heads/main'
+
+    Returns:
+        str: Local ref the remote ref is fetched into, None when no refspec
+             stores it (or a negative refspec excludes it)
+    """
+    target = None
+    for refspec in refspecs:
+        refspec = refspec.strip().lstrip('+')
+        negative = refspec.startswith('^')
+        src, _, dst = refspec.lstrip('^').partition(':')
+        matched = matchRefPattern(src, ref)
+        if matched is None:
+            continue
+        if negative:
+            return None
+        if target is None and dst:
+            target = dst.replace('*', matched, 1)
+    return target
+
+
+class RefReader:
+    """Read branches and remotes of one repository from its git directory"""
+
+    __slots__ = ('gitdir', 'commondir', '_config', '_packed')
+
+    def __init__(self, gitdir, commondir):
+        """
+        Args:
+            gitdir: Git directory of the working tree (holds HEAD)
+            commondir: Directory shared by all worktrees (holds refs and config)
+        """
+        self.gitdir = gitdir
+        self.commondir = commondir
+        self._config = None
+        self._packed = None
+
+    @classmethod
+    def open(cls, repo):
+        """
+        Create a reader for a working tree
+
+        Args:
+            repo: Repository working tree path
+
+        Returns:
+            RefReader: Reader, or None when the layout is not supported
+                       (not a repository, reftable, config includes)
+        """
+        gitdir = discovery.resolveGitDir(repo)
+        if gitdir is None or not os.path.isfile(os.path.join(gitdir, 'HEAD')):
+            return None
+        commondir = discovery.resolveCommonDir(gitdir)
+        if os.path.exists(os.path.join(commondir, 'reftable')):
+            return None
+        reader = cls(gitdir, commondir)
+        config = reader.config()
+        if config is None or UNSUPPORTED_CONFIG.search(config):
+            return None
+        return reader
+
+    def config(self):
+        """
+        Returns:
+            str: Text of the repository config file, None if unreadable
+        """
+        if self._config is None:
+            try:
+                with open(os.path.join(self.commondir, 'config'), 'r') as f:
+                    self._config = f.read()
+            except (OSError, UnicodeDecodeError):
+                return None
+        return self._config
+
+    def readRef(self, name):
+        """
+        Read a loose ref file
+
+        Args:
+            name: Ref name, like 'HEAD' or 'refs/heads/main'
+
+        Returns:
+            str: Content (a sha or 'ref: <target>'), None if missing
+        """
+        base = self.gitdir if name == 'HEAD' else self.commondir
+        try:
+            with open(os.path.join(base, name), 'r') as f:
+                return f.readline().strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def packedRefs(self):
+        """
+        Returns:
+            dict: Refs of the packed-refs file, name -> sha
+        """
+        if self._packed is None:
+            packed = {}
+            try:
+                with open(os.path.join(self.commondir, 'packed-refs'), 'r') as f:
+                    for line in f:
+                        if line.startswith('#') or line.startswith('^'):
+                            continue
+                        sha, _, name = line.rstrip('\n').partition(' ')
+                        if name:
+                            packed[name] = sha
+            except (OSError, UnicodeDecodeError):
+                pass
+            self._packed = packed
+        return self._packed
+
+    def refs(self, prefix):
+        """
+        List the refs below a prefix, loose refs overriding packed ones
+
+        Args:
+            prefix: Ref prefix ending with '/', like 'refs/heads/'
+
+        Returns:
+            dict: Ref name without prefix -> sha, symbolic refs excluded
+        """
+        refs = {
+            name[len(prefix):]: sha
+            for name, sha in self.packedRefs().items() if name.startswith(prefix)
+        }
+        stack = [os.path.join(self.commondir, prefix)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                name = os.path.relpath(entry.path, self.commondir).replace(os.sep, '/')
+                if name.endswith('.lock'):
+                    continue
+                content = self.readRef(name)
+                if content is None:
+                    continue
+                if content.startswith('ref:'):
+                    refs.pop(name[len(prefix):], None)
+                else:
+                    refs[name[len(prefix):]] = content
+        return refs
+
+    def head(self):
+        """
+        Returns:
+            str: Branch checked out, '' on an unborn branch, None when HEAD
+                 is detached or unreadable
+        """
+        content = self.readRef('HEAD')
+        if content is None or not content.startswith('ref:'):
+            return None
+        target = content[len('ref:'):].strip()
+        if not target.startswith('refs/heads/'):
+            return None
+        exists = self.readRef(target) is not None or target in self.packedRefs()
+        return target[len('refs/heads/'):] if exists else ''
+
+    def branches(self):
+        """
+        Returns:
+            tuple: (current branch or '', sorted list of local branches) like
+                   `git branch`, or None when HEAD is detached
+        """
+        current = self.head()
+        if current is None:
+            return None
+        return current, sorted(self.refs('refs/heads/'))
+
+    def remoteConfig(self, name):
+        """
+        Settings of a remote in the repository config
+
+        Args:
+            name: Remote name
+
+        Returns:
+            dict: Lower case key -> list of values, like {'url': [...],
+                  'fetch': [...]}
+        """
+        settings = {}
+        current = False
+        for line in (self.config() or '').splitlines():
+            if line.lstrip().startswith('['):
+                match = REMOTE_SECTION.match(line)
+                current = match is not None and re.sub(r'\\(.)', r'\1', match.group(1)) == name
+                continue
+            if not current:
+                continue
+            match = CONFIG_ENTRY.match(line)
+            if match:
+                settings.setdefault(match.group(1).lower(), []).append(configValue(match.group(2)))
+        return settings
+
+    def remotes(self):
+        """
+        Returns:
+            list: Sorted remote names defined in the repository config
+        """
+        names = set()
+        for line in (self.config() or '').splitlines():
+            match = REMOTE_SECTION.match(line)
+            if match:
+                names.add(re.sub(r'\\(.)', r'\1', match.group(1)))
+        return sorted(names)
+
+    def remoteRefs(self):
+        """
+        Returns:
+            dict: Remote-tracking branches 'remote/branch' -> sha, like
+                  `git branch -r` without symbolic refs
+        """
+        return self.refs('refs/remotes/')
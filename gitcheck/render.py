@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Renderers of gitcheck status records
+
+This module handles:
+- The colored terminal report (rich markup)
+- The HTML fragments of the email report
+- The machine readable records of --format
+All of them turn RepoStatus records (see status.py) into output, without
+running git or touching shared state.
+"""
+
+import os
+from html import escape
+
+
+def formatAge(seconds):
+    """Short human readable age, like 42s, 5m, 3h or 2d"""
+    if seconds is None:
+        return "never"
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return "%d%s" % (seconds // size, unit)
+    return "%ds" % seconds
+
+
+def displayName(path, cwd=None):
+    """
+    Name of a repository in the report, relative to the working directory
+    when possible
+
+    Args:
+        path: Repository path
+        cwd: Working directory (os.getcwd() by default)
+
+    Returns:
+        str: Display name
+    """
+    cwd = os.path.abspath(cwd or os.getcwd())
+    # Remove trailing slash from repository/directory name
+    if path[-1:] == '/':
+        path = path[:-1]
+
+    # Case 1: script was started in a directory that is a git repo
+    if path == cwd:
+        tail = os.path.split(path)[1]
+        return tail if tail != '' else path
+    # Case 2: script was started in a directory with possible subdirs that contain git repos
+    if path.find(cwd) == 0:
+        return path[len(cwd) + 1:]
+    # Case 3: script was started with -d and above cases do not apply
+    return path
+
+
+def showsAge(status, showAge):
+    return showAge and status.branch != "" and status.hasRemotes
+
+
+def renderTerminal(status, out, colortheme, name, verbose=False, showAge=False):
+    """
+    Print the status line of a repository branch (and details in verbose mode)
+
+    Args:
+        status: RepoStatus
+        out: Rich console
+        colortheme: Color theme dict
+        name: Display name of the repository
+        verbose: Also print the files to commit and the commits to push/pull
+        showAge: Show the age of the remote data (--fetch-ttl)
+    """
+    if status.error is not None:
+        out.print(f"[{colortheme['prjchanged']}]{name}[/] [red]{status.error}[/red]")
+        return
+
+    strlocal = ""
+    if status.changes:
+        strlocal = f"[{colortheme['reponame']}]Local[/][[{colortheme['remoteto']}]To Commit:[/]{len(status.changes)}]"
+    topush = ''.join(
+        f" [{colortheme['reponame']}]{r.name}[/][[{colortheme['remoteto']}]To Push:[/]{r.ahead}]"
+        for r in status.remotes if r.ahead > 0
+    )
+    topull = ''.join(
+        f" [{colortheme['reponame']}]{r.name}[/][[{colortheme['remoteto']}]To Pull:[/]{r.behind}]"
+        for r in status.remotes if r.behind > 0
+    )
+    strage = ""
+    if showsAge(status, showAge):
+        age = formatAge(status.fetchAge)
+        strage = f" [dim](fetched {age} ago)[/dim]" if age != "never" else " [dim](never fetched)[/dim]"
+
+    cbranch = f"[{colortheme['branchname']}]{status.branch}[/]"
+    if not status.isChange:
+        prjstyle = colortheme['prjname']
+    elif status.hasRemotes:
+        prjstyle = colortheme['prjchanged']
+    else:
+        prjstyle = colortheme['prjremote']
+    out.print(f"[{prjstyle}]{name}[/]/{cbranch} {strlocal}{topush}{topull}{strage}")
+
+    if not verbose:
+        return
+    if status.isChange:
+        out.print("  [bold]|--Local[/bold]")
+        for code, path in status.changes:
+            out.print(f"     |--[{colortheme['commitstate']}]{code}[/] [{colortheme['fileupdated']}]{path}[/]")
+    for r in status.remotes:
+        if r.ahead:
+            out.print(f"  |--{r.name}")
+            for commit in r.topush:
+                out.print(f"     |--[{colortheme['committo']}][To Push][/] [{colortheme['commitinfo']}]{commit}[/]")
+            if r.ahead > len(r.topush):
+                out.print(f"     |--[dim]... {r.ahead - len(r.topush)} more[/dim]")
+    for r in status.remotes:
+        if r.behind:
+            out.print(f"  |--{r.name}")
+            for commit in r.topull:
+                out.print(f"     |--[{colortheme['committo']}][To Pull][/] [{colortheme['commitinfo']}]{commit}[/]")
+            if r.behind > len(r.topull):
+                out.print(f"     |--[dim]... {r.behind - len(r.topull)} more[/dim]")
+
+
+def renderHtml(status, name, verbose=False, showAge=False):
+    """
+    HTML fragments of the email report for a repository branch
+
+    Args:
+        status: RepoStatus
+        name: Display name of the repository
+        verbose: Also list the files to commit and the commits to push/pull
+        showAge: Show the age of the remote data (--fetch-ttl)
+
+    Returns:
+        list: HTML strings, with every name, path and message escaped
+    """
+    name = escape(name)
+    if status.error is not None:
+        return ['<li><b style="color:red">%s</b> %s</li>\n' % (name, escape(status.error))]
+
+    if status.isChange:
+        htmlprjname = '<b style="color:red">%s</b>' % (name)
+    elif not status.hasRemotes:
+        htmlprjname = '<b style="color:magenta">%s</b>' % (name)
+    else:
+        htmlprjname = '<b style="color:green">%s</b>' % (name)
+
+    htmlstrlocal = ""
+    if status.changes:
+        htmlstrlocal = '<b style="color:orange"> Local</b><b style="color:black">[To Commit:%s]</b>' % len(status.changes)
+    htmltopush = ''.join(
+        '<b style="color:black">%s</b>[<b style="color:blue">To Push:</b><b style="color:black">%s</b>]' % (escape(r.name), r.ahead)
+        for r in status.remotes if r.ahead > 0
+    )
+    htmltopull = ''.join(
+        '<b style="color:black">%s</b>[<b style="color:blue">To Pull:</b><b style="color:black">%s</b>]' % (escape(r.name), r.behind)
+        for r in status.remotes if r.behind > 0
+    )
+    htmlstrage = ""
+    if showsAge(status, showAge):
+        age = formatAge(status.fetchAge)
+        htmlstrage = " <i>(fetched %s ago)</i>" % age if age != "never" else " <i>(never fetched)</i>"
+
+    msg = ["<li>%s/%s %s %s %s%s</li>\n" % (htmlprjname, escape(status.branch), htmlstrlocal, htmltopush, htmltopull, htmlstrage)]
+    if not verbose:
+        return msg
+    if status.isChange:
+        msg.append('<ul><li><b>Local</b></li></ul>\n<ul>\n')
+        for code, path in status.changes:
+            msg.append('<li> <b style="color:orange">[To Commit] </b>%s</li>\n' % escape(path))
+        msg.append('</ul>\n')
+    for attr, countattr, label in (('topush', 'ahead', 'To Push'), ('topull', 'behind', 'To Pull')):
+        for r in status.remotes:
+            commits = getattr(r, attr)
+            if getattr(r, countattr):
+                msg.append('<ul><li><b>%s</b></li>\n</ul>\n<ul>\n' % escape(r.name))
+                for commit in commits:
+                    msg.append('<li><b style="color:blue">[%s] </b>%s</li>\n' % (label, escape(commit)))
+                if getattr(r, countattr) > len(commits):
+                    msg.append('<li><i>... %d more</i></li>\n' % (getattr(r, countattr) - len(commits)))
+                msg.append('</ul>\n')
+    return msg
+
+
+def renderRecord(status):
+    """
+    Machine readable record of a repository branch (--format)
+
+    Returns:
+        dict: JSON serializable record
+    """
+    return {
+        'path': status.path,
+        'branch': status.branch,
+        'changes': None if status.error is not None else len(status.changes),
+        'remotes': {r.name: {'ahead': r.ahead, 'behind': r.behind} for r in status.remotes},
+        'fetch_age': None if status.fetchAge is None else round(status.fetchAge, 1),
+        'action_needed': status.actionNeeded,
+        'error': status.error,
+    }
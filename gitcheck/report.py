@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTML report builder for gitcheck
+
+This module handles:
+- Collecting the HTML fragments of a run in a list (no string concatenation)
+- Starting over at each run, so watch mode does not accumulate old runs
+- Writing result.html incrementally while the repositories are checked
+- Building the complete document for the email report
+"""
+
+from html import escape
+from time import strftime
+
+
+class HtmlReport:
+    """HTML report of one gitcheck run"""
+
+    def __init__(self):
+        self.parts = []
+        self.path = ""
+        self.timestamp = ""
+        self.file = None
+        self.filename = None
+
+    def header(self):
+        return "<html>\n<head>\n<h1>Gitcheck Report</h1>\n<h2>%s</h2>\n</head>\n<body>\n<p><ul>\n" % escape(self.path)
+
+    def footer(self):
+        return "</ul>\n<p>Report created on %s</p>\n</p>\n</body>\n</html>" % self.timestamp
+
+    def start(self, path, filename=None):
+        """
+        Start a new report, dropping the previous one
+
+        Args:
+            path: Searched directory, shown as the report title
+            filename: Optional file written incrementally as fragments are added
+        """
+        self.close()
+        self.parts = []
+        self.path = path
+        self.timestamp = ""
+        self.filename = filename
+        if filename is not None:
+            self.file = open(filename, 'w')
+            self.file.write(self.header())
+            self.file.flush()
+
+    def extend(self, fragments):
+        """Add HTML fragments (already escaped, see render.renderHtml)"""
+        self.parts.extend(fragments)
+        if self.file is not None:
+            self.file.write(''.join(fragments))
+            self.file.flush()
+
+    def finish(self):
+        """Stamp the report and complete the file"""
+        self.timestamp = strftime("%Y-%m-%d %H:%M:%S")
+        if self.file is not None:
+            self.file.write(self.footer())
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def document(self):
+        """
+        Returns:
+            str: The complete HTML document
+        """
+        return self.header() + ''.join(self.parts) + self.footer()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Remote update scheduler for gitcheck
+
+This module handles:
+- Parsing the host of a git remote URL
+- Spreading remote updates across hosts, with a concurrency cap per host
+- Backing off a host that answers with rate limiting (HTTP 429), halving
+  its concurrency and growing it back one step per success
+- Giving up on a host that keeps timing out, failing its remaining jobs at
+  once instead of waiting for each of them
+"""
+
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+LOCAL_HOST = 'local'
+
+# HTTP status 429, as in "The requested URL returned error: 429" or "HTTP/2 429",
+# not any 429 of a message (commit ids, paths, byte counts)
+RETRYABLE_STATUS = re.compile(r'\b(?:http(?:/[0-9.]+)?|error:?)\s*429\b')
+
+RETRYABLE_INDICATORS = [
+    'too many requests',
+    'rate limit',
+]
+
+TIMEOUT_INDICATORS = [
+    'timeout',
+    'timed out',
+]
+
+
+def remoteHost(url):
+    """
+    Get the host of a git remote URL
+
+    Args:
+        url: Remote URL (scheme://[user@]host[:port]/path, [user@]host:path
+             or a local path)
+
+    Returns:
+        str: Host name in lower case, or LOCAL_HOST for local remotes
+    """
+    if not url or url.lower().startswith('file://'):
+        return LOCAL_HOST
+    match = re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/]*@)?(\[[^\]]+\]|[^:/]+)', url)
+    if match:
+        return match.group(1).lower()
+    # scp-like syntax, a colon before any slash
+    match = re.match(r'^(?:[^@/]+@)?([^:/]+):', url)
+    if match and not re.match(r'^[a-zA-Z]:[\\/]', url):
+        return match.group(1).lower()
+    return LOCAL_HOST
+
+
+def isRetryableError(message):
+    """
+    Check if an error message indicates rate limiting
+
+    Args:
+        message: Error message string
+
+    Returns:
+        bool: True if the update should be retried later
+    """
+    message = (message or '').lower()
+    if RETRYABLE_STATUS.search(message):
+        return True
+    return any(indicator in message for indicator in RETRYABLE_INDICATORS)
+
+
+def isTimeoutError(message):
+    """Check if an error message indicates a timeout (not retried, see HostScheduler)"""
+    message = (message or '').lower()
+    return any(indicator in message for indicator in TIMEOUT_INDICATORS)
+
+
+class HostScheduler:
+    """Run one job per repository with global and per-host concurrency limits"""
+
+    def __init__(self, max_workers, per_host=None, retries=3, backoff=2.0, max_backoff=60.0, retryable=None,
+                 timed_out=None, max_timeouts=3, unreachable=None):
+        """
+        Args:
+            max_workers: Maximum number of jobs running at once
+            per_host: Maximum number of jobs running at once against one host
+                      (None for max_workers)
+            retries: How many times a job is retried after a retryable result
+            backoff: First backoff delay in seconds, doubled at each retry
+            max_backoff: Upper bound of the backoff delay
+            retryable: Function result -> bool telling if a job must be retried
+            timed_out: Function result -> bool telling if a job timed out
+            max_timeouts: Consecutive timeouts after which a host is given up
+            unreachable: Function (item, host) -> result of the jobs of a host
+                         given up (required with timed_out)
+        """
+        self.max_workers = max_workers
+        self.per_host = per_host or max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retryable = retryable or (lambda result: False)
+        self.timed_out = timed_out or (lambda result: False)
+        self.max_timeouts = max_timeouts
+        self.unreachable = unreachable
+        self.limits = {}
+        self.holdUntil = {}
+        self.timeouts = {}  # host -> consecutive timeouts
+        self.down = set()
+
+    def limit(self, host):
+        if host == LOCAL_HOST:
+            return self.max_workers
+        return self.limits.get(host, self.per_host)
+
+    def _queues(self, jobs):
+        queues = OrderedDict()
+        for host, item in jobs:
+            queues.setdefault(host, deque()).append((item, 0))
+        return queues
+
+    def _nextJobs(self, queues, active, running):
+        """Pick the jobs that can start now, round-robin across hosts"""
+        now = time.monotonic()
+        started = []
+        launched = True
+        while launched and running + len(started) < self.max_workers:
+            launched = False
+            for host in list(queues):
+                if running + len(started) >= self.max_workers:
+                    break
+                if active.get(host, 0) >= self.limit(host) or self.holdUntil.get(host, 0) > now:
+                    continue
+                item, attempt = queues[host].popleft()
+                if not queues[host]:
+                    del queues[host]
+                active[host] = active.get(host, 0) + 1
+                started.append((host, item, attempt))
+                launched = True
+        return started
+
+    def _finished(self, queues, active, host, item, attempt, result):
+        """
+        Record a finished job
+
+        Returns:
+            list: Final (item, result) pairs: none when the job is retried,
+                  and the jobs of the host when it is given up
+        """
+        active[host] -= 1
+        if host == LOCAL_HOST:
+            return [(item, result)]
+        if self.retryable(result) and attempt < self.retries and host not in self.down:
+            # Multiplicative decrease, and pause the host for a while
+            self.limits[host] = max(1, self.limit(host) // 2)
+            delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+            self.holdUntil[host] = time.monotonic() + delay
+            queues.setdefault(host, deque()).appendleft((item, attempt + 1))
+            queues.move_to_end(host, last=False)
+            return []
+
+        final = [(item, result)]
+        if not self.timed_out(result):
+            self.timeouts[host] = 0
+            if self.limit(host) < self.per_host:
+                # Additive increase
+                self.limits[host] = self.limit(host) + 1
+            return final
+        # Timeouts are not retried: a dead host would cost a timeout per
+        # attempt of every repository. After a few in a row, give it up.
+        self.timeouts[host] = self.timeouts.get(host, 0) + 1
+        if self.timeouts[host] >= self.max_timeouts and self.unreachable is not None:
+            self.down.add(host)
+            for other, _ in queues.pop(host, ()):
+                final.append((other, self.unreachable(other, host)))
+        return final
+
+    def _waitDelay(self, queues):
+        """Time until a paused host resumes, None if no host is paused"""
+        now = time.monotonic()
+        holds = [self.holdUntil[host] - now for host in queues if self.holdUntil.get(host, 0) > now]
+        return max(0.05, min(holds)) if holds else None
+
+    def run(self, jobs, func, callback):
+        """
+        Run jobs on a thread pool
+
+        Args:
+            jobs: List of (host, item)
+            func: Function item -> result, run on a worker thread
+            callback: Function (item, result) called on the calling thread
+                      with each final result
+        """
+        queues = self._queues(jobs)
+        active = {}
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while queues or pending:
+                    for host, item, attempt in self._nextJobs(queues, active, len(pending)):
+                        pending[executor.submit(func, item)] = (host, item, attempt)
+
+                    if not pending:
+                        time.sleep(self._waitDelay(queues) or 0.05)
+                        continue
+
+                    done, _ = wait(list(pending), timeout=self._waitDelay(queues), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        host, item, attempt = pending.pop(future)
+                        for item, result in self._finished(queues, active, host, item, attempt, future.result()):
+                            callback(item, result)
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    async def runAsync(self, jobs, coro_func, callback):
+        """
+        Run jobs as coroutines
+
+        Args:
+            jobs: List of (host, item)
+            coro_func: Coroutine function item -> result
+            callback: Function (item, result) called with each final result
+        """
+        import asyncio
+
+        queues = self._queues(jobs)
+        active = {}
+        pending = {}
+        try:
+            while queues or pending:
+                for host, item, attempt in self._nextJobs(queues, active, len(pending)):
+                    pending[asyncio.ensure_future(coro_func(item))] = (host, item, attempt)
+
+                if not pending:
+                    await asyncio.sleep(self._waitDelay(queues) or 0.05)
+                    continue
+
+                done, _ = await asyncio.wait(list(pending), timeout=self._waitDelay(queues), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    host, item, attempt = pending.pop(task)
+                    for item, result in self._finished(queues, active, host, item, attempt, task.result()):
+                        callback(item, result)
+        finally:
+            for task in pending:
+                task.cancel()
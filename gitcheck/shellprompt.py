@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shell prompt status of gitcheck (--prompt, gitcheck_prompt)
+
+This module handles:
+- Finding the repository enclosing the current directory, walking up
+- Getting its status with a single `git status --porcelain=v2 --branch`,
+  killed when it exceeds the latency budget
+- Caching the answers in ~/.gitcheck/prompt.json, keyed on the index and
+  the refs of the repository, so most prompts run no git process at all
+- Formatting a compact string like "main ↑2 ↓1 *3"
+It only imports the dependency free discovery, refs, porcelain and jsonstore
+modules of gitcheck, not rich, to start fast.
+"""
+
+import os
+import sys
+import time
+from os.path import expanduser
+
+from . import discovery
+from . import jsonstore
+from . import porcelain
+from .refs import RefReader
+
+CACHE_FILE = os.path.join(expanduser('~'), '.gitcheck', 'prompt.json')
+# Files edited without touching the index do not change the cache key,
+# cached answers expire after CACHE_TTL seconds to catch them
+CACHE_TTL = 10.0
+CACHE_SIZE = 200
+TIMEOUT = 0.5
+
+
+def statKey(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def stateKey(repo, upstream=None):
+    """
+    Signature of the repository state a prompt depends on: index, HEAD,
+    branch and upstream refs, read directly from the git directory
+
+    Args:
+        repo: Repository working tree path
+        upstream: Upstream branch, like 'origin/main'
+
+    Returns:
+        list: JSON serializable key, None when the refs cannot be read
+              directly (the prompt is not cached then)
+    """
+    reader = RefReader.open(repo)
+    if reader is None:
+        return None
+    head = reader.readRef('HEAD')
+    key = [
+        statKey(os.path.join(reader.gitdir, 'index')),
+        head,
+        statKey(os.path.join(reader.commondir, 'packed-refs')),
+    ]
+    if head and head.startswith('ref:'):
+        key.append(reader.readRef(head[len('ref:'):].strip()))
+    if upstream:
+        key.append(reader.readRef('refs/remotes/' + upstream))
+    return key
+
+
+def parseStatus(output):
+    """
+    Prompt state from the output of `git status --porcelain=v2 --branch`
+    (see porcelain.parseStatus)
+
+    Returns:
+        dict: branch (None when detached), oid, upstream, ahead, behind,
+              changes and untracked counts
+    """
+    status = porcelain.parseStatus(output)
+    codes = [code for code, _ in status['changes']]
+    untracked = codes.count('??')
+    return {
+        'branch': status['head'],
+        'oid': status['oid'],
+        'upstream': status['upstream'],
+        'ahead': status['ahead'] or 0,
+        'behind': status['behind'] or 0,
+        'changes': len(codes) - untracked - codes.count('!!'),
+        'untracked': untracked,
+    }
+
+
+def formatPrompt(state):
+    """Compact prompt text: branch (or short sha), ↑ahead ↓behind *changes ?untracked"""
+    if state['branch'] is not None:
+        parts = [state['branch']]
+    else:
+        parts = ['(%s)' % (state['oid'] or '')[:7]]
+    for symbol, field in (('↑', 'ahead'), ('↓', 'behind'), ('*', 'changes'), ('?', 'untracked')):
+        if state[field]:
+            parts.append('%s%d' % (symbol, state[field]))
+    return ' '.join(parts)
+
+
+def gitStatus(repo, untracked, timeout):
+    """Run the single git command of the prompt, killed after timeout seconds"""
+    import subprocess
+
+    cmd = [
+        'git', '--no-optional-locks', '-C', repo, 'status', '--porcelain=v2', '--branch',
+        '--untracked-files=%s' % ('normal' if untracked else 'no'),
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout, check=True)
+    return result.stdout.decode('utf-8', 'replace')
+
+
+def saveCache(filename, cache):
+    """Write the cache atomically (prompts of several shells share it), keeping the newest entries"""
+    if len(cache) > CACHE_SIZE:
+        newest = sorted(cache.items(), key=lambda item: item[1].get('time', 0), reverse=True)[:CACHE_SIZE]
+        cache = dict(newest)
+    jsonstore.saveJson(filename, cache)
+
+
+def promptStatus(path, untracked=False, timeout=TIMEOUT, cacheFile=CACHE_FILE, ttl=CACHE_TTL):
+    """
+    Prompt text of the repository enclosing path
+
+    A cached answer is used while the index and refs are unchanged and it is
+    younger than ttl seconds. When git exceeds the timeout, the last cached
+    answer is used, even if outdated.
+
+    Args:
+        path: Directory
+        untracked: Count untracked files
+        timeout: Latency budget of the git command in seconds
+        cacheFile: Cache file, None to disable the cache
+        ttl: Maximum age of cached answers in seconds
+
+    Returns:
+        str: Prompt text, '' outside repositories or when git fails
+    """
+    repo = discovery.findEnclosingRepository(path)
+    if repo is None:
+        return ''
+    cache = jsonstore.loadJson(cacheFile) if cacheFile else {}
+    entry = cache.get(repo)
+    if entry is not None and entry.get('untracked') != untracked:
+        entry = None
+    if entry is not None and time.time() - entry.get('time', 0) < ttl:
+        key = stateKey(repo, entry.get('upstream'))
+        if key is not None and key == entry.get('key'):
+            return entry['text']
+
+    import subprocess
+    try:
+        state = parseStatus(gitStatus(repo, untracked, timeout))
+    except subprocess.TimeoutExpired:
+        return entry['text'] if entry is not None else ''
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return ''
+    text = formatPrompt(state)
+
+    if cacheFile:
+        key = stateKey(repo, state['upstream'])
+        if key is not None:
+            cache[repo] = {
+                'key': key, 'text': text, 'time': time.time(),
+                'upstream': state['upstream'], 'untracked': untracked,
+            }
+            saveCache(cacheFile, cache)
+    return text
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Print a compact git status of the current repository for shell prompts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Output: branch ↑ahead ↓behind *changes ?untracked (nothing outside repositories)
+
+Examples:
+  PS1='$(%(prog)s) \\$ '                    # bash
+  %(prog)s -u --timeout 0.2 ~/src/project
+""",
+    )
+    parser.add_argument('path', nargs='?', default=os.getcwd(), help='directory (default: current directory)')
+    parser.add_argument('-u', '--untracked', action='store_true', help='count untracked files')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT,
+                        help='latency budget of git in seconds, the last answer is shown beyond (default: %s)' % TIMEOUT)
+    parser.add_argument('--ttl', type=float, default=CACHE_TTL,
+                        help='maximum age of cached answers in seconds (default: %s)' % CACHE_TTL)
+    parser.add_argument('--no-cache', action='store_true', help='always run git, do not read nor write the cache')
+    args = parser.parse_args()
+
+    text = promptStatus(args.path, args.untracked, args.timeout, None if args.no_cache else CACHE_FILE, args.ttl)
+    if text:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-repository cache of git queries for a single gitcheck run
+
+A RepoSnapshot answers the questions gitcheck asks about a repository
+(status, branches, remotes, remote branches, ahead/behind counts, commit
+lists) and remembers each answer, so the same git command is never run
+twice for a repository during one run. Commands that change the repository
+(pull, commit, reset, fetch...) go through RepoSnapshot.execute(), which
+drops the cached answers.
+
+The answers can also be primed from outside (see pendingQueries() and
+prime()), which lets the asyncio engine run the git commands concurrently
+and then evaluate the status synchronously from the cache.
+
+Branches, remotes and remote-tracking branches are read from the git
+directory files (see refs.RefReader) when the layout allows it, without
+running git at all.
+"""
+
+import re
+
+from . import porcelain
+from .refs import RefReader
+
+
+class RepoSnapshot:
+    """Memoized view of one repository's git state"""
+
+    __slots__ = (
+        'path', 'gitExec', 'untracked', 'ignoreLocal', 'readRefs', 'maxCommits', '_reader',
+        '_outputs', '_status', '_branches', '_remotes', '_remoteBranches',
+        '_config', '_remoteRefs',
+    )
+
+    def __init__(self, path, git_exec_func, untracked=False, ignoreLocal=r'^$', readRefs=True, maxCommits=None):
+        """
+        Args:
+            path: Repository path
+            git_exec_func: Function to execute git commands
+            untracked: Include untracked files in the status
+            ignoreLocal: Regex (string or compiled) of `git status -s` lines
+                         to ignore, compiled once here
+            readRefs: Read refs and remotes from the git directory files
+                      instead of running git when possible
+            maxCommits: Maximum number of lines of the commit lists (None
+                        for no limit)
+        """
+        self.path = path
+        self.gitExec = git_exec_func
+        self.untracked = untracked
+        self.ignoreLocal = re.compile(ignoreLocal)
+        self.readRefs = readRefs
+        self.maxCommits = maxCommits
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget every cached answer"""
+        self._outputs = {}
+        self._status = None
+        self._branches = None
+        self._remotes = None
+        self._remoteBranches = None
+        self._config = None
+        self._remoteRefs = None
+        self._reader = None
+
+    def reader(self):
+        """
+        Returns:
+            RefReader: Reader of the git directory files, None when git must
+                       be run instead (unsupported layout or readRefs off)
+        """
+        if self._reader is None:
+            self._reader = (self.readRefs and RefReader.open(self.path)) or False
+        return self._reader or None
+
+    def query(self, cmd):
+        """
+        Run a read-only git command once per snapshot
+
+        Args:
+            cmd: Git arguments (without the leading 'git'), as a tuple
+
+        Returns:
+            str: Command output, cached
+        """
+        output = self._outputs.get(cmd)
+        if output is None:
+            output = self.gitExec(self.path, cmd)
+            self._outputs[cmd] = output
+        return output
+
+    def prime(self, cmd, output):
+        """Store the output of a read-only git command run by someone else"""
+        self._outputs[cmd] = output
+
+    def statusCommand(self):
+        if self.untracked:
+            return ('status', '--porcelain=v2', '--branch')
+        return ('status', '--porcelain=v2', '--branch', '-uno')
+
+    def pendingQueries(self, branches, verbose=False):
+        """
+        List the read-only git commands still needed to check branches
+
+        Commands only appear once their inputs are cached, so callers loop:
+        run the pending commands, prime() their outputs, ask again until
+        the list is empty.
+
+        Args:
+            branches: Branches that will be checked
+            verbose: Also list the commit lists of verbose mode
+
+        Returns:
+            list: Git argument tuples not in the cache yet
+        """
+        queries = [self.statusCommand()]
+        reader = self.reader()
+        if reader is None or reader.branches() is None:
+            queries.append(('branch',))
+        if reader is None:
+            queries += [('remote',), ('branch', '-r')]
+        if all(q in self._outputs for q in queries):
+            queries = []
+            for branch in branches:
+                if not branch:
+                    continue
+                for remote in self.remotes():
+                    cmd = self.aheadBehindCommand(remote, branch)
+                    if cmd is not None:
+                        queries.append(cmd)
+                    elif verbose and self.maxCommits != 0:
+                        ahead, behind = self.aheadBehind(remote, branch)
+                        if ahead:
+                            queries.append(self.logCommand("%s/%s..%s" % (remote, branch, branch)))
+                        if behind:
+                            queries.append(self.logCommand("%s..%s/%s" % (branch, remote, branch)))
+        return [q for q in queries if q not in self._outputs]
+
+    def execute(self, cmd, timeout=None):
+        """
+        Run a git command that changes the repository
+
+        Args:
+            cmd: Git arguments (without the leading 'git')
+            timeout: Timeout in seconds
+
+        Returns:
+            str: Command output
+        """
+        try:
+            return self.gitExec(self.path, cmd, timeout=timeout)
+        finally:
+            self.invalidate()
+
+    def status(self):
+        """
+        Returns:
+            dict: Parsed porcelain v2 status (see porcelain.parseStatus),
+                  with ignored local changes filtered out
+        """
+        if self._status is None:
+            result = self.query(self.statusCommand())
+            status = porcelain.parseStatus(result)
+
+            # Filter with the same "XY path" lines that `git status -s` prints
+            ignored = self.ignoreLocal.match
+            status['changes'] = [
+                c for c in status['changes']
+                if not ignored("%s %s" % (c[0], c[1]))
+            ]
+            self._status = status
+        return self._status
+
+    def branches(self):
+        """
+        Returns:
+            tuple: (current branch or '', list of all local branches)
+        """
+        if self._branches is None:
+            reader = self.reader()
+            if reader is not None:
+                self._branches = reader.branches()
+        if self._branches is None:
+            # Detached HEAD: keep the name `git branch` gives it
+            current = ""
+            branches = []
+            for line in self.query(('branch',)).splitlines():
+                if line.startswith('* '):
+                    current = line[2:]
+                branches.append(line[2:])
+            self._branches = (current, branches)
+        return self._branches
+
+    def remotes(self):
+        """
+        Returns:
+            list: Remote names
+        """
+        if self._remotes is None:
+            reader = self.reader()
+            if reader is not None:
+                self._remotes = reader.remotes()
+            else:
+                result = self.query(('remote',))
+                self._remotes = [x for x in result.split('\n') if x]
+        return self._remotes
+
+    def remoteBranches(self):
+        """
+        Returns:
+            set: Remote-tracking branches as 'remote/branch'
+        """
+        if self._remoteBranches is None:
+            reader = self.reader()
+            if reader is not None:
+                self._remoteBranches = set(reader.remoteRefs())
+            else:
+                result = self.query(('branch', '-r'))
+                self._remoteBranches = {
+                    line.strip() for line in result.splitlines() if ' -> ' not in line
+                }
+        return self._remoteBranches
+
+    def config(self):
+        """
+        Returns:
+            dict: Repository (local) git configuration, keys in lower case
+                  as printed by `git config --list`
+        """
+        if self._config is None:
+            config = {}
+            for line in self.query(('config', '--local', '--list')).splitlines():
+                key, _, value = line.partition('=')
+                config[key] = value
+            self._config = config
+        return self._config
+
+    def remoteValues(self, remote, key):
+        """
+        Returns:
+            list: Values of remote.<remote>.<key> (key in lower case, like
+                  'url' or 'fetch') in the repository config
+        """
+        reader = self.reader()
+        if reader is not None:
+            return reader.remoteConfig(remote).get(key, [])
+        # `git config --list` prints each value of a multivar on its own line
+        prefix = 'remote.%s.%s=' % (remote, key)
+        return [
+            line[len(prefix):] for line in self.query(('config', '--local', '--list')).splitlines()
+            if line.startswith(prefix)
+        ]
+
+    def remoteRefsCommand(self):
+        return ('for-each-ref', '--format=%(objectname) %(refname)', 'refs/remotes/')
+
+    def remoteRefs(self, remote):
+        """
+        Returns:
+            dict: Remote-tracking branches of remote, branch name -> sha
+        """
+        if self._remoteRefs is None:
+            reader = self.reader()
+            if reader is not None:
+                lines = ['%s refs/remotes/%s' % (sha, ref) for ref, sha in reader.remoteRefs().items()]
+            else:
+                lines = self.query(self.remoteRefsCommand()).splitlines()
+            # Remote names may contain '/' (e.g. 'team/origin'): match the
+            # configured names, the longest first
+            remotes = sorted(self.remotes(), key=len, reverse=True)
+            refs = {}
+            for line in lines:
+                sha, _, ref = line.partition(' ')
+                ref = ref[len('refs/remotes/'):]
+                name = next((r for r in remotes if ref.startswith(r + '/')), None)
+                if name is None:
+                    continue
+                branch = ref[len(name) + 1:]
+                if branch and branch != 'HEAD':
+                    refs.setdefault(name, {})[branch] = sha
+            self._remoteRefs = refs
+        return self._remoteRefs.get(remote, {})
+
+    def hasRemoteBranch(self, remote, branch):
+        return '%s/%s' % (remote, branch) in self.remoteBranches()
+
+    def aheadBehindCommand(self, remote, branch):
+        """
+        Returns:
+            str: The `git rev-list` command counting commits of branch against
+                 remote/branch, or None if the porcelain status already has
+                 the counts, the remote branch does not exist or the counts
+                 are already cached
+        """
+        status = self.status()
+        if status['head'] == branch \
+                and status['upstream'] == '%s/%s' % (remote, branch) \
+                and status['ahead'] is not None:
+            return None
+        if not self.hasRemoteBranch(remote, branch):
+            return None
+        cmd = self.revListCommand(remote, branch)
+        if cmd in self._outputs:
+            return None
+        return cmd
+
+    def revListCommand(self, remote, branch):
+        return ('rev-list', '--left-right', '--count', '%s...%s/%s' % (branch, remote, branch))
+
+    def aheadBehind(self, remote, branch):
+        """
+        Count commits of branch not on remote/branch and the reverse
+
+        The counts come from the porcelain status when remote/branch is the
+        upstream of the checked out branch, otherwise from `git rev-list`.
+
+        Returns:
+            tuple: (ahead, behind), (0, 0) when remote/branch does not exist
+        """
+        status = self.status()
+        if status['head'] == branch \
+                and status['upstream'] == '%s/%s' % (remote, branch) \
+                and status['ahead'] is not None:
+            return status['ahead'], status['behind']
+        if not self.hasRemoteBranch(remote, branch):
+            return 0, 0
+        result = self.query(self.revListCommand(remote, branch))
+        ahead, behind = result.split()
+        return int(ahead), int(behind)
+
+    def logCommand(self, revrange):
+        if self.maxCommits is not None:
+            return ('log', '--max-count=%d' % self.maxCommits, revrange, '--oneline')
+        return ('log', revrange, '--oneline')
+
+    def log(self, revrange):
+        """
+        Returns:
+            list: `git log --oneline` lines of the revision range, the
+                  maxCommits most recent ones when limited
+        """
+        if self.maxCommits == 0:
+            return []
+        result = self.query(self.logCommand(revrange))
+        return [x for x in result.split('\n') if x]
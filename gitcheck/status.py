@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Status records of gitcheck
+
+The status stage of gitcheck turns a repository branch into a RepoStatus,
+an immutable (and picklable) record holding everything the renderers need.
+Records carry no rendering state, so the stage can run on any worker
+thread or process while the renderers (see render.py) run on the caller,
+or in the --daemon, which sends them to its clients as JSON.
+"""
+
+from collections import namedtuple
+
+
+class RemoteStatus(namedtuple('RemoteStatus', ['name', 'ahead', 'behind', 'topush', 'topull'])):
+    """
+    Comparison of a branch with one remote
+
+    Fields:
+        name: Remote name
+        ahead: Number of commits to push
+        behind: Number of commits to pull
+        topush: `git log --oneline` lines to push (only in verbose mode)
+        topull: `git log --oneline` lines to pull (only in verbose mode)
+    """
+
+    __slots__ = ()
+
+
+class RepoStatus(namedtuple('RepoStatus', ['path', 'branch', 'changes', 'hasRemotes', 'remotes', 'fetchAge', 'error'])):
+    """
+    Status of one branch of a repository
+
+    Fields:
+        path: Repository path
+        branch: Branch name ('' without branch, None when the check failed)
+        changes: Tuple of (status code, path) of the files to commit
+        hasRemotes: True if the repository has remotes
+        remotes: Tuple of RemoteStatus, empty without branch
+        fetchAge: Seconds since the last fetch, None if never fetched
+        error: Error message when the check failed, None otherwise
+    """
+
+    __slots__ = ()
+
+    @property
+    def actionNeeded(self):
+        """Commits to push or pull (local file changes do not count)"""
+        return any(r.ahead or r.behind for r in self.remotes)
+
+    @property
+    def isChange(self):
+        """Files to commit, or commits to push or pull"""
+        return bool(self.changes) or self.actionNeeded
+
+
+def failedStatus(path, error):
+    """RepoStatus of a repository that could not be checked"""
+    return RepoStatus(path, None, (), False, (), None, str(error))
+
+
+def statusToDict(status):
+    """JSON serializable form of a RepoStatus (see statusFromDict)"""
+    data = status._asdict()
+    data['changes'] = [list(change) for change in status.changes]
+    data['remotes'] = [r._asdict() for r in status.remotes]
+    return data
+
+
+def statusFromDict(data):
+    """RepoStatus from its statusToDict form"""
+    return RepoStatus(
+        path=data['path'],
+        branch=data['branch'],
+        changes=tuple(tuple(change) for change in data['changes']),
+        hasRemotes=data['hasRemotes'],
+        remotes=tuple(
+            RemoteStatus(r['name'], r['ahead'], r['behind'], tuple(r['topush']), tuple(r['topull']))
+            for r in data['remotes']
+        ),
+        fetchAge=data['fetchAge'],
+        error=data['error'],
+    )
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+File change watchers for the event driven watch mode of gitcheck
+
+This module handles:
+- Watching the working trees and git directories of repositories with
+  inotify on Linux (through ctypes, no extra dependency)
+- A polling fallback comparing stat() signatures, for other systems or
+  when the inotify watch limit is reached
+- Reporting which repositories changed, ignoring the files git rewrites
+  by itself while gitcheck checks a repository (index, lock files)
+- Skipping the working tree directories matching the exclude globs
+  (node_modules, build output...), in both watchers
+"""
+
+import os
+import select
+import struct
+import time
+
+from . import discovery
+
+
+# Files of the git directory that tell a commit, checkout or fetch happened
+GITDIR_FILES = ('HEAD', 'packed-refs')
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO \
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def watchedPaths(repo):
+    """
+    List the directories to watch for one repository
+
+    Args:
+        repo: Repository working tree path
+
+    Returns:
+        list: (directory, kind) pairs, kind being 'tree' (working tree,
+              recursive), 'gitdir' (only GITDIR_FILES) or 'refs' (recursive)
+    """
+    paths = [(repo, 'tree')]
+    gitdir = discovery.resolveGitDir(repo)
+    if gitdir is not None:
+        commondir = discovery.resolveCommonDir(gitdir)
+        paths.append((gitdir, 'gitdir'))
+        if commondir != gitdir:
+            paths.append((commondir, 'gitdir'))
+        paths.append((os.path.join(commondir, 'refs'), 'refs'))
+    return paths
+
+
+def walkDirectories(root, excludes=()):
+    """Yield root and its subdirectories, skipping nested .git directories and the excluded ones"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        yield directory
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.name != '.git' and entry.is_dir(follow_symlinks=False) \
+                                and not discovery.isExcluded(entry.name, entry.path, excludes):
+                            stack.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+def isRelevant(kind, name):
+    """Check if a change of the file name in a directory of this kind matters"""
+    if name.endswith('.lock'):
+        return False
+    if kind == 'gitdir':
+        return name in GITDIR_FILES
+    if kind == 'tree':
+        return name != '.git'
+    return True
+
+
+class InotifyWatcher:
+    """Watch repositories with Linux inotify"""
+
+    def __init__(self, repositories, debug=None, excludes=()):
+        """
+        Args:
+            repositories: Repository working tree paths
+            debug: Optional function called with debug messages
+            excludes: Glob patterns of working tree directories not to watch
+
+        Raises:
+            OSError: inotify is not available or the watch limit is reached
+        """
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.ctypes = ctypes
+        self.debug = debug
+        self.excludes = list(excludes)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # wd -> (directory, kind, set of repositories)
+        self.repositories = set()
+        try:
+            for repo in repositories:
+                self.addRepository(repo)
+        except OSError:
+            self.close()
+            raise
+        if debug:
+            debug("Watching %d directories with inotify" % len(self.watches))
+
+    def addRepository(self, repo):
+        for path, kind in watchedPaths(repo):
+            if kind == 'gitdir':
+                self.addWatch(path, kind, repo)
+            else:
+                for directory in walkDirectories(path, self.excludes if kind == 'tree' else ()):
+                    self.addWatch(directory, kind, repo)
+        self.repositories.add(repo)
+
+    def removeRepository(self, repo):
+        """Stop watching repo, removing the watches no other repository shares"""
+        for wd, (_, _, repos) in list(self.watches.items()):
+            repos.discard(repo)
+            if not repos:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+        self.repositories.discard(repo)
+
+    def setRepositories(self, repositories):
+        """
+        Watch exactly these repositories (e.g. after a new search)
+
+        Raises:
+            OSError: The watch limit is reached
+        """
+        wanted = set(repositories)
+        for repo in self.repositories - wanted:
+            self.removeRepository(repo)
+        for repo in wanted - self.repositories:
+            self.addRepository(repo)
+        if self.debug:
+            self.debug("Watching %d directories with inotify" % len(self.watches))
+
+    def addWatch(self, directory, kind, repo):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = self.ctypes.get_errno()
+            if errno == 28:  # ENOSPC, fs.inotify.max_user_watches reached
+                raise OSError(errno, "inotify watch limit reached")
+            return  # Directory vanished or unreadable
+        entry = self.watches.setdefault(wd, (directory, kind, set()))
+        entry[2].add(repo)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def readEvents(self, changed):
+        """Read the pending events, adding the changed repositories to changed"""
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, everything may have changed
+                for _, _, repos in self.watches.values():
+                    changed.update(repos)
+                continue
+            entry = self.watches.get(wd)
+            if entry is None:
+                continue
+            directory, kind, repos = entry
+            if mask & IN_DELETE_SELF:
+                del self.watches[wd]
+                changed.update(repos)
+                continue
+            if not isRelevant(kind, name):
+                continue
+            path = os.path.join(directory, name)
+            excludes = self.excludes if kind == 'tree' else ()
+            if mask & IN_ISDIR and discovery.isExcluded(name, path, excludes):
+                continue
+            changed.update(repos)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and kind != 'gitdir':
+                # Follow new directories of the working tree and refs
+                for repo in repos:
+                    for subdir in walkDirectories(path, excludes):
+                        try:
+                            self.addWatch(subdir, kind, repo)
+                        except OSError:
+                            pass
+
+    def wait(self, timeout, settle=0.2):
+        """
+        Wait for changes
+
+        Args:
+            timeout: Maximum time to wait in seconds
+            settle: Time to keep collecting events after the first one, so a
+                    checkout or a build is reported once
+
+        Returns:
+            set: Repositories that changed (empty on timeout)
+        """
+        changed = set()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return changed
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return changed
+            self.readEvents(changed)
+            if changed:
+                deadline = min(deadline, time.monotonic() + settle)
+
+
+class PollingWatcher:
+    """Watch repositories by comparing stat() signatures at each interval"""
+
+    def __init__(self, repositories, debug=None, excludes=()):
+        """
+        Args:
+            repositories: Repository working tree paths
+            debug: Optional function called with debug messages
+            excludes: Glob patterns of working tree directories not to watch
+        """
+        self.excludes = list(excludes)
+        self.repositories = list(repositories)
+        self.signatures = {repo: self.signature(repo) for repo in self.repositories}
+        if debug:
+            debug("Watching %d repositories by polling" % len(self.repositories))
+
+    def signature(self, repo):
+        """
+        Returns:
+            tuple: Names, sizes and mtimes of the watched files of repo
+        """
+        entries = []
+        for path, kind in watchedPaths(repo):
+            excludes = self.excludes if kind == 'tree' else ()
+            directories = [path] if kind == 'gitdir' else walkDirectories(path, excludes)
+            for directory in directories:
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            if not isRelevant(kind, entry.name):
+                                continue
+                            try:
+                                if excludes and entry.is_dir(follow_symlinks=False) \
+                                        and discovery.isExcluded(entry.name, entry.path, excludes):
+                                    continue
+                                st = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            entries.append((entry.path, st.st_size, st.st_mtime_ns))
+                except OSError:
+                    continue
+        entries.sort()
+        return tuple(entries)
+
+    def setRepositories(self, repositories):
+        """Watch exactly these repositories (e.g. after a new search)"""
+        self.repositories = list(repositories)
+        self.signatures = {
+            repo: self.signatures[repo] if repo in self.signatures else self.signature(repo)
+            for repo in self.repositories
+        }
+
+    def close(self):
+        pass
+
+    def wait(self, timeout):
+        """
+        Sleep for timeout seconds, then compare the signatures
+
+        Returns:
+            set: Repositories that changed
+        """
+        time.sleep(timeout)
+        changed = set()
+        for repo in self.repositories:
+            signature = self.signature(repo)
+            if signature != self.signatures[repo]:
+                self.signatures[repo] = signature
+                changed.add(repo)
+        return changed
+
+
+def createWatcher(repositories, debug=None, excludes=()):
+    """
+    Create the best watcher available
+
+    Args:
+        repositories: Repository working tree paths
+        debug: Optional function called with debug messages
+        excludes: Glob patterns of working tree directories not to watch
+                  (the -x/--exclude globs of the search)
+
+    Returns:
+        InotifyWatcher or PollingWatcher
+    """
+    try:
+        return InotifyWatcher(repositories, debug, excludes)
+    except (OSError, AttributeError) as e:
+        if debug:
+            debug("inotify unavailable (%s), falling back to polling" % e)
+        return PollingWatcher(repositories, debug, excludes)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unittest of the repository discovery"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from gitcheck import discovery
+
+
+def makeRepository(path):
+    """Minimal repository layout: a .git directory holding HEAD"""
+    os.makedirs(os.path.join(path, '.git'))
+    with open(os.path.join(path, '.git', 'HEAD'), 'w') as f:
+        f.write('ref: refs/heads/main\n')
+
+
+PAST = time.time() - 3600
+
+
+def age(root, when=PAST):
+    """Move the mtime of every directory below root back, out of the racy window"""
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (when, when))
+
+
+class TestFindRepositories(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def path(self, *names):
+        return os.path.join(self.root, *names)
+
+    def test_excludes(self):
+        makeRepository(self.path('src', 'app'))
+        makeRepository(self.path('src', 'app2', 'node_modules', 'dep'))
+        makeRepository(self.path('vendor', 'lib'))
+        found = discovery.findRepositories(self.root, excludes=['node_modules', self.path('vendor')])
+        self.assertEqual(sorted(found), [self.path('src', 'app')])
+
+    def test_maxdepth(self):
+        makeRepository(self.path('top'))
+        makeRepository(self.path('a', 'b', 'deep'))
+        self.assertEqual(discovery.findRepositories(self.root, maxdepth=1), [self.path('top')])
+        self.assertEqual(sorted(discovery.findRepositories(self.root, maxdepth=3)),
+                         [self.path('a', 'b', 'deep'), self.path('top')])
+
+    def test_repositoriesAreNotSearched(self):
+        makeRepository(self.path('outer'))
+        makeRepository(self.path('outer', 'vendored'))
+        self.assertEqual(discovery.findRepositories(self.root), [self.path('outer')])
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "symlinks are not supported")
+    def test_symlinkedGitDirectory(self):
+        makeRepository(self.path('store', 'real'))
+        os.makedirs(self.path('proj'))
+        os.symlink(self.path('store', 'real', '.git'), self.path('proj', '.git'))
+        found = sorted(discovery.findRepositories(self.root))
+        self.assertEqual(found, [self.path('proj'), self.path('store', 'real')])
+        self.assertEqual(discovery.resolveGitDir(self.path('proj')), self.path('proj', '.git'))
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "symlinks are not supported")
+    def test_symlinkedDirectoriesAreNotFollowed(self):
+        makeRepository(self.path('store', 'real'))
+        os.symlink(self.path('store'), self.path('link'))
+        self.assertEqual(discovery.findRepositories(self.root), [self.path('store', 'real')])
+
+
+class TestFindRepositoriesIndexed(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.index = {}
+        makeRepository(os.path.join(self.root, 'one'))
+        os.makedirs(os.path.join(self.root, 'group', 'empty'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def scan(self, **kwargs):
+        messages = []
+        found, changed = discovery.findRepositoriesIndexed(self.root, self.index, debug=messages.append, **kwargs)
+        return sorted(found), changed, messages[-1]
+
+    def test_unchangedTreeIsNotRescanned(self):
+        age(self.root)
+        found, changed, summary = self.scan()
+        self.assertEqual(found, [os.path.join(self.root, 'one')])
+        self.assertTrue(changed)
+        found, changed, summary = self.scan()
+        self.assertEqual(found, [os.path.join(self.root, 'one')])
+        self.assertFalse(changed)
+        self.assertIn('0 rescanned', summary)
+
+    def test_rescanAfterAddingNestedRepository(self):
+        age(self.root)
+        self.scan()
+        makeRepository(os.path.join(self.root, 'group', 'empty', 'new'))
+        age(os.path.join(self.root, 'group', 'empty'), PAST + 60)
+        found, changed, summary = self.scan()
+        self.assertEqual(found, [os.path.join(self.root, 'group', 'empty', 'new'), os.path.join(self.root, 'one')])
+        self.assertTrue(changed)
+        # Only the modified directory and the new one are listed
+        self.assertIn('2 rescanned', summary)
+
+    def test_removedDirectoriesArePruned(self):
+        age(self.root)
+        self.scan()
+        shutil.rmtree(os.path.join(self.root, 'group'))
+        age(self.root, PAST + 60)
+        found, changed, _ = self.scan()
+        self.assertEqual(found, [os.path.join(self.root, 'one')])
+        self.assertTrue(changed)
+        key = discovery.indexKey(self.root, None, [])
+        self.assertNotIn(os.path.join(self.root, 'group'), self.index['roots'][key])
+
+    def test_racyMtimeIsRescanned(self):
+        # Directories modified just before the scan may change again unseen
+        found, changed, _ = self.scan()
+        found, changed, summary = self.scan()
+        self.assertTrue(changed)
+        self.assertNotIn(' 0 rescanned', summary)
+
+    def test_rescan(self):
+        age(self.root)
+        self.scan()
+        _, changed, summary = self.scan(rescan=True)
+        self.assertTrue(changed)
+        self.assertNotIn(' 0 rescanned', summary)
+
+    def test_excludesAndDepthHaveTheirOwnEntries(self):
+        age(self.root)
+        self.scan()
+        _, changed, _ = self.scan(maxdepth=1)
+        self.assertTrue(changed)
+        _, changed, _ = self.scan(excludes=['group'])
+        self.assertTrue(changed)
+        self.assertEqual(len(self.index['roots']), 3)
+
+    def test_staleRootsArePruned(self):
+        age(self.root)
+        self.index = {'roots': {'stale': {}, 'recent': {}}, 'used': {
+            'stale': time.time() - discovery.INDEX_MAX_AGE - 1,
+            'recent': time.time() - 3600,
+        }}
+        self.scan()
+        self.assertEqual(sorted(self.index['roots']), sorted(['recent', discovery.indexKey(self.root, None, [])]))
+        self.assertEqual(sorted(self.index['used']), sorted(self.index['roots']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unittest of the porcelain v2 status parser"""
+
+import unittest
+
+from gitcheck.porcelain import parseStatus
+
+SHA1 = '78981922613b2afb6025042ff6bd878ac1994e85'
+SHA2 = 'f2ad6c76f0115a6ba5b00456a849810e7ec0af20'
+
+
+class TestParseStatus(unittest.TestCase):
+    def test_branchHeaders(self):
+        status = parseStatus(
+            '# branch.oid 66e0cf49c3a6ec68edd90a50c22671b642fcf45b\n'
+            '# branch.head main\n'
+            '# branch.upstream origin/main\n'
+            '# branch.ab +2 -3\n'
+        )
+        self.assertEqual(status['head'], 'main')
+        self.assertEqual(status['oid'], '66e0cf49c3a6ec68edd90a50c22671b642fcf45b')
+        self.assertEqual(status['upstream'], 'origin/main')
+        self.assertEqual(status['ahead'], 2)
+        self.assertEqual(status['behind'], 3)
+        self.assertEqual(status['changes'], [])
+
+    def test_detachedInitialWithoutUpstream(self):
+        status = parseStatus('# branch.oid (initial)\n# branch.head (detached)\n')
+        self.assertIsNone(status['head'])
+        self.assertIsNone(status['oid'])
+        self.assertIsNone(status['upstream'])
+        self.assertIsNone(status['ahead'])
+        self.assertIsNone(status['behind'])
+
+    def test_ordinaryChanges(self):
+        status = parseStatus(
+            '1 .M N... 100644 100644 100644 %s %s modified.txt\n'
+            '1 A. N... 000000 100644 100644 %s %s added.txt\n' % (SHA1, SHA1, '0' * 40, SHA2)
+        )
+        self.assertEqual(status['changes'], [[' M', 'modified.txt'], ['A ', 'added.txt']])
+
+    def test_rename(self):
+        status = parseStatus('2 RM N... 100644 100644 100644 %s %s R100 new name.txt\told name.txt\n' % (SHA1, SHA1))
+        self.assertEqual(status['changes'], [['RM', 'old name.txt -> new name.txt']])
+
+    def test_unmerged(self):
+        status = parseStatus('u UU N... 100644 100644 100644 100644 %s %s %s c.txt\n' % (SHA1, SHA2, SHA1))
+        self.assertEqual(status['changes'], [['UU', 'c.txt']])
+
+    def test_pathsWithSpaces(self):
+        status = parseStatus(
+            '1 .M N... 100644 100644 100644 %s %s dir with space/a b.txt\n'
+            'u AA N... 000000 100644 100644 100644 %s %s %s both added.txt\n'
+            '? with space.txt\n'
+            '! ignored dir/\n' % (SHA1, SHA1, '0' * 40, SHA1, SHA2)
+        )
+        self.assertEqual(status['changes'], [
+            [' M', 'dir with space/a b.txt'],
+            ['AA', 'both added.txt'],
+            ['??', 'with space.txt'],
+            ['!!', 'ignored dir/'],
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unittest of the pure Python ref reader"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from gitcheck.refs import RefReader, applyRefspecs, configValue
+
+GIT_ENV = dict(
+    os.environ,
+    GIT_AUTHOR_NAME='gitcheck', GIT_AUTHOR_EMAIL='gitcheck@example.com',
+    GIT_COMMITTER_NAME='gitcheck', GIT_COMMITTER_EMAIL='gitcheck@example.com',
+    GIT_CONFIG_NOSYSTEM='1', HOME=tempfile.gettempdir(),
+)
+
+
+def git(repo, *args):
+    result = subprocess.run(('git', '-C', repo) + args, stdout=subprocess.PIPE, env=GIT_ENV, check=True)
+    return result.stdout.decode('utf-8').strip()
+
+
+class TestRefReader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.repo = os.path.join(self.tmpdir, 'repo')
+        os.makedirs(self.repo)
+        git(self.repo, 'init', '-q', '-b', 'main')
+        git(self.repo, 'commit', '-q', '--allow-empty', '-m', 'first')
+        self.first = git(self.repo, 'rev-parse', 'HEAD')
+        git(self.repo, 'branch', 'packed')
+        git(self.repo, 'tag', '-a', '-m', 'annotated', 'v1')
+        git(self.repo, 'remote', 'add', 'origin', 'https://example.com/repo.git')
+        git(self.repo, 'remote', 'add', 'team/origin', 'https://example.com/team.git')
+        git(self.repo, 'update-ref', 'refs/remotes/origin/main', self.first)
+        git(self.repo, 'symbolic-ref', 'refs/remotes/origin/HEAD', 'refs/remotes/origin/main')
+        git(self.repo, 'pack-refs', '--all')
+        git(self.repo, 'commit', '-q', '--allow-empty', '-m', 'second')
+        self.second = git(self.repo, 'rev-parse', 'HEAD')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_packedRefsSkipPeeledLines(self):
+        reader = RefReader.open(self.repo)
+        packed = reader.packedRefs()
+        self.assertEqual(packed['refs/heads/packed'], self.first)
+        self.assertIn('refs/tags/v1', packed)
+        self.assertNotEqual(packed['refs/tags/v1'], self.first)  # the tag object, not the peeled commit
+        self.assertTrue(all(not name.startswith('^') and ' ' not in name for name in packed))
+
+    def test_looseRefsOverridePackedOnes(self):
+        reader = RefReader.open(self.repo)
+        self.assertEqual(reader.packedRefs()['refs/heads/main'], self.first)
+        self.assertEqual(reader.refs('refs/heads/'), {'main': self.second, 'packed': self.first})
+        self.assertEqual(reader.branches(), ('main', ['main', 'packed']))
+
+    def test_remotes(self):
+        reader = RefReader.open(self.repo)
+        self.assertEqual(reader.remotes(), ['origin', 'team/origin'])
+        # Symbolic refs like origin/HEAD are left out
+        self.assertEqual(reader.remoteRefs(), {'origin/main': self.first})
+
+    def test_remoteConfig(self):
+        git(self.repo, 'config', '--add', 'remote.origin.fetch', '^refs/heads/tmp/*')
+        reader = RefReader.open(self.repo)
+        self.assertEqual(reader.remoteConfig('origin'), {
+            'url': ['https://example.com/repo.git'],
+            'fetch': ['+refs/heads/*:refs/remotes/origin/*', '^refs/heads/tmp/*'],
+        })
+        self.assertEqual(reader.remoteConfig('team/origin')['url'], ['https://example.com/team.git'])
+        self.assertEqual(reader.remoteConfig('missing'), {})
+
+    def test_detachedHead(self):
+        git(self.repo, 'checkout', '-q', '--detach', self.first)
+        reader = RefReader.open(self.repo)
+        self.assertIsNone(reader.head())
+        self.assertIsNone(reader.branches())
+
+    def test_unbornBranch(self):
+        git(self.repo, 'checkout', '-q', '--orphan', 'unborn')
+        self.assertEqual(RefReader.open(self.repo).head(), '')
+
+    def test_linkedWorktree(self):
+        worktree = os.path.join(self.tmpdir, 'worktree')
+        git(self.repo, 'worktree', 'add', '-q', '-b', 'feature', worktree, self.first)
+        reader = RefReader.open(worktree)
+        self.assertNotEqual(reader.gitdir, reader.commondir)
+        self.assertEqual(os.path.realpath(reader.commondir), os.path.realpath(os.path.join(self.repo, '.git')))
+        # HEAD is per worktree, branches and remotes are shared
+        self.assertEqual(reader.head(), 'feature')
+        self.assertEqual(reader.branches(), ('feature', ['feature', 'main', 'packed']))
+        self.assertEqual(reader.remotes(), ['origin', 'team/origin'])
+        self.assertEqual(RefReader.open(self.repo).head(), 'main')
+
+    def test_notARepository(self):
+        self.assertIsNone(RefReader.open(self.tmpdir))
+
+
+class TestRefspecs(unittest.TestCase):
+    def test_wildcard(self):
+        refspecs = ['+refs/heads/*:refs/remotes/origin/*']
+        self.assertEqual(applyRefspecs(refspecs, 'refs/heads/feature/x'), 'refs/remotes/origin/feature/x')
+
+    def test_singleBranch(self):
+        refspecs = ['+refs/heads/main:refs/remotes/origin/main']
+        self.assertEqual(applyRefspecs(refspecs, 'refs/heads/main'), 'refs/remotes/origin/main')
+        self.assertIsNone(applyRefspecs(refspecs, 'refs/heads/dev'))
+
+    def test_negativeRefspec(self):
+        refspecs = ['+refs/heads/*:refs/remotes/origin/*', '^refs/heads/tmp/*']
+        self.assertIsNone(applyRefspecs(refspecs, 'refs/heads/tmp/x'))
+        self.assertEqual(applyRefspecs(refspecs, 'refs/heads/main'), 'refs/remotes/origin/main')
+
+    def test_noDestination(self):
+        self.assertIsNone(applyRefspecs(['refs/heads/main'], 'refs/heads/main'))
+        self.assertIsNone(applyRefspecs([], 'refs/heads/main'))
+
+    def test_configValue(self):
+        self.assertEqual(configValue(' https://example.com/a.git '), 'https://example.com/a.git')
+        self.assertEqual(configValue(' "a # b" ; comment'), 'a # b')
+        self.assertEqual(configValue(' value # comment'), 'value')
+        self.assertEqual(configValue(r' "tab\there" '), 'tab\there')
+        self.assertEqual(configValue(None), 'true')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unittest of the HTML email report renderer"""
+
+import unittest
+
+from gitcheck.render import renderHtml
+from gitcheck.status import RepoStatus, RemoteStatus, failedStatus
+
+UNSAFE = '<script>alert("x&y")</script>'
+ESCAPED = '&lt;script&gt;alert(&quot;x&amp;y&quot;)&lt;/script&gt;'
+
+
+class TestRenderHtml(unittest.TestCase):
+    def setUp(self):
+        remote = RemoteStatus('origin<b>', 1, 1, ['abc1234 %s' % UNSAFE], ['def5678 <i>pull</i>'])
+        self.status = RepoStatus(
+            '/src/repo', 'feature/<b>', [['??', 'a<b>.txt'], [' M', 'x&y.txt']], True, [remote], None, None,
+        )
+
+    def test_escapesSummary(self):
+        html = ''.join(renderHtml(self.status, 'repo<&>'))
+        self.assertIn('repo&lt;&amp;&gt;', html)
+        self.assertIn('/feature/&lt;b&gt;', html)
+        self.assertIn('origin&lt;b&gt;', html)
+        self.assertNotIn('<b>', html.replace('<b style=', ''))
+
+    def test_escapesVerboseDetails(self):
+        html = ''.join(renderHtml(self.status, 'repo', verbose=True))
+        self.assertIn('a&lt;b&gt;.txt', html)
+        self.assertIn('x&amp;y.txt', html)
+        self.assertIn('abc1234 %s' % ESCAPED, html)
+        self.assertIn('def5678 &lt;i&gt;pull&lt;/i&gt;', html)
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('<i>pull', html)
+
+    def test_escapesErrors(self):
+        html = ''.join(renderHtml(failedStatus('/src/repo', UNSAFE), 'repo<1>'))
+        self.assertIn('repo&lt;1&gt;', html)
+        self.assertIn(ESCAPED, html)
+        self.assertNotIn('<script>', html)
+
+
+if __name__ == '__main__':
+    unittest.main()